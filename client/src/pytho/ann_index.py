@@ -0,0 +1,236 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from build_resources import replace_dir, temp_dir_for
+from embedding_store import store_key
+
+# An inverted-file (IVF) index over unit-length rows, in pure NumPy.
+# The vocabulary is clustered with spherical k-means; a query only scores the
+# rows of the nprobe clusters whose centroids are closest to it, so the work
+# is about N * nprobe / nlist instead of N. With product quantization (PQ)
+# the rows are additionally compressed to one byte per subspace and scored
+# from lookup tables, and only a short list is re-scored exactly.
+#
+# On disk an index is a directory of .npy files (memory-mapped on load):
+#   centroids.npy   (nlist, dim) float32
+#   offsets.npy     (nlist + 1,) int64 - list i is rows[offsets[i]:offsets[i+1]]
+#   rows.npy        (N,) int32 - vocabulary rows grouped by list
+#   codebooks.npy   (m, 256, dim / m) float32   [PQ only]
+#   codes.npy       (N, m) uint8, in the same order as rows.npy   [PQ only]
+#   meta.json       parameters, and the store_key of the store it was built from
+# A rebuild is written to a temporary directory and swapped in whole, since
+# serving workers have the previous one memory-mapped.
+ANN_DIR = 'ann'
+
+
+def kmeans(data, k, iterations=20, spherical=True, seed=0, block_size=8192):
+    """
+    Plain Lloyd k-means. spherical=True clusters by cosine and keeps the
+    centroids unit length; otherwise by Euclidean distance.
+    Returns (centroids, assignment).
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype='float32')
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    assignment = np.zeros(len(data), dtype='int32')
+    for _ in range(iterations):
+        assignment = assign(data, centroids, spherical, block_size)
+        # Per-cluster sums via one sort and a segmented reduction
+        order = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=k)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(data[order], starts[filled], axis=0)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters with random points
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = sums / counts[:, None]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = centroids / norms
+        centroids = centroids.astype('float32')
+    return centroids, assign(data, centroids, spherical, block_size)
+
+
+def assign(data, centroids, spherical=True, block_size=8192):
+    """
+    Index of the nearest centroid for every row of data, computed in blocks
+    """
+    result = np.empty(len(data), dtype='int32')
+    squared = None if spherical else (centroids ** 2).sum(axis=1)
+    for start in range(0, len(data), block_size):
+        dots = data[start:start + block_size] @ centroids.T
+        if spherical:
+            result[start:start + block_size] = dots.argmax(axis=1)
+        else:
+            # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 does not change the argmin
+            result[start:start + block_size] = (squared - 2 * dots).argmin(axis=1)
+    return result
+
+
+class IVFIndex:
+    """
+    Approximate inner-product search over unit vectors. nprobe is the
+    recall/latency knob: more probed lists means higher recall and more work.
+    """
+
+    def __init__(self, centroids, offsets, rows, codebooks=None, codes=None, nprobe=8, rerank=100):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.codebooks = codebooks
+        self.codes = codes
+        self.nprobe = nprobe
+        # With PQ, how many approximate hits are re-scored exactly
+        self.rerank = rerank
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, unit, nlist=None, pq_subspaces=0, iterations=20, train_size=50000, seed=0):
+        """
+        Cluster unit (N, dim) into nlist lists, optionally with a PQ of
+        pq_subspaces bytes per row. k-means is trained on a sample of at most
+        train_size rows and then every row is assigned.
+        """
+        unit = np.asarray(unit, dtype='float32')
+        n, dim = unit.shape
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample = unit[np.sort(rng.choice(n, min(n, train_size), replace=False))]
+
+        centroids, _ = kmeans(sample, nlist, iterations, spherical=True, seed=seed)
+        assignment = assign(unit, centroids)
+        rows = np.argsort(assignment, kind='stable').astype('int32')
+        offsets = np.zeros(len(centroids) + 1, dtype='int64')
+        np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=offsets[1:])
+
+        codebooks = codes = None
+        if pq_subspaces:
+            if dim % pq_subspaces:
+                raise ValueError(f"dim {dim} is not divisible by {pq_subspaces} PQ subspaces")
+            sub = dim // pq_subspaces
+            codebooks = np.empty((pq_subspaces, 256, sub), dtype='float32')
+            codes = np.empty((n, pq_subspaces), dtype='uint8')
+            ordered = unit[rows]
+            for j in range(pq_subspaces):
+                part = slice(j * sub, (j + 1) * sub)
+                book, _ = kmeans(sample[:, part], 256, iterations, spherical=False, seed=seed + j)
+                codebooks[j, :len(book)] = book
+                codebooks[j, len(book):] = 0
+                codes[:, j] = assign(ordered[:, part], book, spherical=False)
+        return cls(centroids, offsets, rows, codebooks, codes)
+
+    def search(self, query, unit, top_n=10, nprobe=None):
+        """
+        Approximate top_n rows of unit by inner product with the unit-length
+        query. unit is the full matrix, used for exact (re-)scoring.
+        Returns (rows, scores), best first.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            lists = np.arange(self.nlist)
+        spans = [np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        positions = np.concatenate(spans) if spans else np.empty(0, dtype='int64')
+        if len(positions) == 0:
+            return np.empty(0, dtype='int32'), np.empty(0, dtype='float32')
+
+        if self.codes is not None:
+            # Asymmetric distance: one lookup table per subspace for the query,
+            # then every candidate's score is the sum of m table entries
+            m, _, sub = self.codebooks.shape
+            tables = np.einsum('jkd,jd->jk', self.codebooks, query.reshape(m, sub))
+            approx = tables[np.arange(m), self.codes[positions]].sum(axis=1)
+            keep = min(len(positions), max(self.rerank, top_n))
+            if keep < len(positions):
+                positions = positions[np.argpartition(-approx, keep - 1)[:keep]]
+
+        candidates = np.asarray(self.rows[positions])
+        scores = unit[candidates] @ query
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        return candidates[order], scores[order]
+
+    def save(self, index_dir, store=None):
+        """
+        Write the index to index_dir; store is the store_key of the
+        embedding store it was built from
+        """
+        tmp_dir = temp_dir_for(index_dir)
+        try:
+            self.write(tmp_dir, store)
+            replace_dir(tmp_dir, index_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def write(self, index_dir, store):
+        np.save(os.path.join(index_dir, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(index_dir, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(index_dir, 'rows.npy'), self.rows)
+        if self.codes is not None:
+            np.save(os.path.join(index_dir, 'codebooks.npy'), self.codebooks)
+            np.save(os.path.join(index_dir, 'codes.npy'), self.codes)
+        with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'nlist': self.nlist, 'nprobe': self.nprobe, 'rerank': self.rerank,
+                       'pq_subspaces': 0 if self.codes is None else self.codes.shape[1], 'store': store}, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        with open(os.path.join(index_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode='r')
+
+        codebooks = codes = None
+        if meta['pq_subspaces']:
+            codebooks, codes = np.asarray(array('codebooks.npy')), array('codes.npy')
+        return cls(np.asarray(array('centroids.npy')), np.asarray(array('offsets.npy')),
+                   array('rows.npy'), codebooks, codes, meta['nprobe'], meta['rerank'])
+
+
+def ann_exists(store_dir):
+    return os.path.exists(os.path.join(store_dir, ANN_DIR, 'meta.json'))
+
+
+def ann_matches(store_dir):
+    """
+    True if the index in store_dir was built from the store as it is now;
+    a stale one would return the rows of another vocabulary
+    """
+    try:
+        with open(os.path.join(store_dir, ANN_DIR, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('store') == store_key(store_dir)
+
+
+if __name__ == "__main__":
+    # Usage: python ann_index.py glove_en_store [nlist] [pq_subspaces] [nprobe]
+    # The index is written to glove_en_store/ann next to the embeddings.
+    from embedding_store import EmbeddingStore
+    store_dir = sys.argv[1]
+    nlist = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    pq_subspaces = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    store = EmbeddingStore(store_dir)
+    index = IVFIndex.build(store.unit_vectors(), nlist, pq_subspaces)
+    if len(sys.argv) > 4:
+        index.nprobe = int(sys.argv[4])
+    index.save(os.path.join(store_dir, ANN_DIR), store_key(store_dir))
+    print(f"Wrote IVF index with {index.nlist} lists to {os.path.join(store_dir, ANN_DIR)}")
@@ -0,0 +1,238 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import librosa
+import numpy as np
+
+from audio_cache import default_cache, params_key
+
+# One analysis pipeline per track: the audio is decoded once, and the STFT,
+# mel spectrogram, onset envelope and RMS are computed once, the first time
+# anything needs them. BPM, beat times, onset times and pitch are derived
+# from those on demand, so a full analysis costs one decode and one STFT.
+#
+#   track = analyze('beat1.mp3')
+#   track.bpm, track.beat_times, track.onset_times, track.notes()
+#
+# With an AudioCache (audio_cache.py; analyze uses the default one) the
+# decoded PCM is memory-mapped from disk and beats, onsets and pitch are
+# read back instead of recomputed, for as long as the file is unchanged.
+SAMPLE_RATE = 22050
+HOP_LENGTH = 512
+N_FFT = 2048
+FMIN = librosa.note_to_hz('C2')
+FMAX = librosa.note_to_hz('C7')
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def freq_to_note(freq):
+    """
+    Convert frequency in Hz to the nearest musical note (A4 = 440 Hz -> 'A4')
+    """
+    if freq is None or np.isnan(freq) or freq <= 0:
+        return None
+    midi = int(round(69 + 12 * np.log2(freq / 440.0)))
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+class TrackAnalysis:
+    """
+    Cached analysis of one decoded track. Every attribute below is computed
+    on first access and kept; all of them share the same STFT frames
+    (n_fft, hop_length), so their frame indices line up. Given a cache and
+    the file's content hash (digest), beats, onsets and pitch also go
+    through the cache.
+    """
+
+    def __init__(self, y, sr, hop_length=HOP_LENGTH, n_fft=N_FFT, fmin=FMIN, fmax=FMAX, cache=None, digest=None):
+        self.y = y
+        self.sr = sr
+        self.hop_length = hop_length
+        self.n_fft = n_fft
+        self.fmin = fmin
+        self.fmax = fmax
+        self.cache = cache
+        self.digest = digest
+        self._notes = {}
+
+    @classmethod
+    def load(cls, audio_path, sr=SAMPLE_RATE, cache=None, **params):
+        """
+        Decode audio_path (resampled to sr; sr=None keeps the file's rate),
+        or map it from cache
+        """
+        if cache is None:
+            y, sr = librosa.load(audio_path, sr=sr)
+            return cls(y, sr, **params)
+        y, sr = cache.load_pcm(audio_path, sr)
+        return cls(y, sr, cache=cache, digest=cache.file_hash(audio_path), **params)
+
+    def cached(self, name, compute):
+        """
+        The dict of arrays compute() returns, read from the cache if there
+        is one and it has them
+        """
+        if self.cache is None:
+            return compute()
+        params = params_key(self.sr, self.hop_length, self.n_fft, self.fmin, self.fmax)
+        arrays = self.cache.load_features(self.digest, name, params)
+        if arrays is None:
+            arrays = compute()
+            self.cache.save_features(self.digest, name, params, arrays)
+        return arrays
+
+    @property
+    def duration(self):
+        return len(self.y) / self.sr
+
+    @cached_property
+    def magnitude(self):
+        """
+        |STFT|, the one spectrogram everything else is derived from
+        """
+        return np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    def mel_db(self):
+        mel = librosa.feature.melspectrogram(S=self.magnitude ** 2, sr=self.sr)
+        return librosa.power_to_db(mel)
+
+    @cached_property
+    def onset_envelope(self):
+        # The same envelope onset_strength(y=...) computes, from the shared STFT
+        return librosa.onset.onset_strength(S=self.mel_db, sr=self.sr, hop_length=self.hop_length)
+
+    @cached_property
+    def beat_envelope(self):
+        # beat_track(y=...) tracks a median-aggregated envelope; same mel frames
+        return librosa.onset.onset_strength(S=self.mel_db, sr=self.sr, hop_length=self.hop_length,
+                                            aggregate=np.median)
+
+    @cached_property
+    def rms(self):
+        return librosa.feature.rms(S=self.magnitude, frame_length=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def beats(self):
+        """
+        (tempo in BPM, beat frames)
+        """
+        def track():
+            tempo, frames = librosa.beat.beat_track(onset_envelope=self.beat_envelope, sr=self.sr,
+                                                    hop_length=self.hop_length)
+            return {'tempo': np.atleast_1d(tempo), 'frames': frames.astype('int32')}
+        arrays = self.cached('beats', track)
+        return float(arrays['tempo'][0]), arrays['frames']
+
+    @property
+    def bpm(self):
+        return self.beats[0]
+
+    @cached_property
+    def beat_times(self):
+        return librosa.frames_to_time(self.beats[1], sr=self.sr, hop_length=self.hop_length)
+
+    @cached_property
+    def onset_times(self):
+        def detect():
+            frames = librosa.onset.onset_detect(onset_envelope=self.onset_envelope, sr=self.sr,
+                                                hop_length=self.hop_length)
+            return {'frames': frames.astype('int32')}
+        frames = self.cached('onsets', detect)['frames']
+        return librosa.frames_to_time(frames, sr=self.sr, hop_length=self.hop_length)
+
+    def notes(self, method='pyin'):
+        """
+        DataFrame of (time, frequency, note, voiced) per frame between fmin
+        and fmax, from pYIN or (method='fast') the gated, decimated YIN of
+        pitch_fast.py. Pitch tracking works on the waveform, so it is only
+        run when asked for, and once per method.
+        """
+        if method not in ('pyin', 'fast'):
+            raise ValueError(f"Unknown pitch method '{method}'")
+        if method not in self._notes:
+            import pandas as pd
+
+            def track():
+                if method == 'fast':
+                    from pitch_fast import fast_pitch
+                    f0, voiced_flag = fast_pitch(self.y, self.sr, self.fmin, self.fmax,
+                                                 frame_length=self.n_fft, hop_length=self.hop_length)
+                else:
+                    f0, voiced_flag, _ = librosa.pyin(self.y, fmin=self.fmin, fmax=self.fmax, sr=self.sr,
+                                                      frame_length=self.n_fft, hop_length=self.hop_length)
+                return {'f0': f0.astype('float32'), 'voiced': voiced_flag}
+            arrays = self.cached('pyin' if method == 'pyin' else 'yin_fast', track)
+            f0, voiced_flag = arrays['f0'].astype('float64'), arrays['voiced']
+            self._notes[method] = pd.DataFrame({
+                'time': librosa.times_like(f0, sr=self.sr, hop_length=self.hop_length),
+                'frequency': f0,
+                'note': [freq_to_note(freq) for freq in f0],
+                'voiced': voiced_flag,
+            })
+        return self._notes[method]
+
+    def drop_spectrograms(self):
+        """
+        Free the STFT, mel spectrogram and the envelopes derived from them;
+        they are computed again if asked for
+        """
+        for name in ('magnitude', 'mel_db', 'onset_envelope', 'beat_envelope', 'rms'):
+            self.__dict__.pop(name, None)
+
+    def summary(self):
+        """
+        BPM, beat and onset times as plain lists (JSON-ready)
+        """
+        return {
+            'duration': round(self.duration, 3),
+            'bpm': round(self.bpm, 2),
+            'beat_times': [round(float(t), 3) for t in self.beat_times],
+            'onset_times': [round(float(t), 3) for t in self.onset_times],
+        }
+
+
+# The last few analyses, so asking for the BPM and then the beats of the
+# same file does not decode it twice
+TRACK_CACHE_SIZE = 8
+_tracks = OrderedDict()
+_tracks_lock = threading.Lock()
+
+
+def analyze(audio_path, sr=SAMPLE_RATE, hop_length=HOP_LENGTH, n_fft=N_FFT, fmin=FMIN, fmax=FMAX):
+    """
+    The TrackAnalysis of audio_path with these parameters, reused while the
+    file is unchanged (in memory for the last few, on disk through the
+    default AudioCache)
+    """
+    stat = os.stat(audio_path)
+    key = (os.path.realpath(audio_path), stat.st_size, stat.st_mtime_ns, sr, hop_length, n_fft, fmin, fmax)
+    with _tracks_lock:
+        track = _tracks.get(key)
+        if track is not None:
+            _tracks.move_to_end(key)
+            return track
+    track = TrackAnalysis.load(audio_path, sr, cache=default_cache(), hop_length=hop_length, n_fft=n_fft,
+                               fmin=fmin, fmax=fmax)
+    with _tracks_lock:
+        _tracks[key] = track
+        while len(_tracks) > TRACK_CACHE_SIZE:
+            _tracks.popitem(last=False)
+    return track
+
+
+if __name__ == "__main__":
+    # Usage: python audio_analysis.py beat1.mp3 [--notes | --fast-notes]
+    track = analyze(sys.argv[1])
+    summary = track.summary()
+    if track.cache is not None:
+        print(f"Audio cache: {track.cache.stats()}")
+    print(f"Estimated BPM: {summary['bpm']}")
+    print(f"{len(summary['beat_times'])} beats, {len(summary['onset_times'])} onsets over {summary['duration']}s")
+    if '--notes' in sys.argv[2:] or '--fast-notes' in sys.argv[2:]:
+        notes = track.notes('fast' if '--fast-notes' in sys.argv[2:] else 'pyin')
+        print(notes[notes['voiced']])
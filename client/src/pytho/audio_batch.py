@@ -0,0 +1,179 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_analysis import SAMPLE_RATE, TrackAnalysis
+from audio_cache import default_cache
+
+# Batch analysis of a whole beats library: every file of a directory (or of
+# a manifest listing one path per line) is analysed in a process pool with
+# one worker per core, and BPM, beat grid, onset times and duration of all
+# of them go to one table:
+#   <out>.parquet  one row per file; beat_times / onset_times as lists
+#   <out>.csv      when pandas / pyarrow are missing; lists space-separated
+# Files that fail to decode are reported and left out. Running it again
+# over the same output only analyses files that are new or changed since
+# (same path, size and mtime are kept from the previous table), and goes
+# through the audio cache (audio_cache.py), so analysing a library again
+# with other output files skips decoding.
+#
+# Usage: python audio_batch.py public/beats|manifest.txt library[.parquet|.csv] [workers]
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.aif', '.aiff')
+COLUMNS = ['path', 'size', 'mtime_ns', 'duration', 'bpm', 'beat_times', 'onset_times']
+
+
+def list_audio(source):
+    """
+    Audio files under a directory, or the paths listed in a manifest
+    (relative to the manifest, '#' starts a comment)
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(root, name)
+                 for root, _, names in os.walk(source)
+                 for name in names if name.lower().endswith(AUDIO_EXTENSIONS)]
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+        paths = [os.path.join(base, line) for line in lines if line]
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+# Worker state, set once per process by _init_worker
+_thread_limits = None
+
+
+def _init_worker():
+    # One process per core already; BLAS threads on top of that only contend.
+    # numpy is loaded by now, so the limit is set at run time (threadpoolctl
+    # comes with librosa, through scikit-learn)
+    global _thread_limits
+    from threadpoolctl import threadpool_limits
+    _thread_limits = threadpool_limits(1)
+
+
+def analyze_file(path, sr=SAMPLE_RATE):
+    """
+    One output row for path (runs in a worker)
+    """
+    stat = os.stat(path)
+    summary = TrackAnalysis.load(path, sr, cache=default_cache()).summary()
+    return {
+        'path': path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'duration': summary['duration'],
+        'bpm': summary['bpm'],
+        'beat_times': summary['beat_times'],
+        'onset_times': summary['onset_times'],
+    }
+
+
+def output_path(out):
+    """
+    out with its extension: .parquet when pyarrow is there, else .csv
+    """
+    root, ext = os.path.splitext(out)
+    if ext in ('.parquet', '.csv'):
+        return out
+    try:
+        import pyarrow  # noqa: F401
+        return root + '.parquet'
+    except ImportError:
+        return root + '.csv'
+
+
+def read_rows(path):
+    """
+    Rows of a table written by write_rows, or [] if there is none
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        import pandas as pd
+    except ImportError:
+        import csv
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row['size'] = int(row['size'])
+            row['mtime_ns'] = int(row['mtime_ns'])
+            row['duration'] = float(row['duration'])
+            row['bpm'] = float(row['bpm'])
+            for column in ('beat_times', 'onset_times'):
+                row[column] = [float(t) for t in row[column].split()]
+        return rows
+    if path.endswith('.parquet'):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, keep_default_na=False)
+        for column in ('beat_times', 'onset_times'):
+            frame[column] = [[float(t) for t in value.split()] for value in frame[column]]
+    return [{column: (list(value) if column in ('beat_times', 'onset_times') else value)
+             for column, value in row.items()} for row in frame.to_dict('records')]
+
+
+def write_rows(rows, path):
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(path, index=False)
+        return
+    import csv
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, 'beat_times': ' '.join(str(t) for t in row['beat_times']),
+                             'onset_times': ' '.join(str(t) for t in row['onset_times'])})
+
+
+def run(source, out, workers=None, sr=SAMPLE_RATE):
+    """
+    Analyse every file of source not already in out (unchanged), and write
+    the whole table to out; returns (output path, rows, failed paths)
+    """
+    out = output_path(out)
+    paths = list_audio(source)
+    previous = {row['path']: row for row in read_rows(out)}
+    rows, todo = [], []
+    for path in paths:
+        stat = os.stat(path)
+        row = previous.get(path)
+        if row is not None and int(row['size']) == stat.st_size and int(row['mtime_ns']) == stat.st_mtime_ns:
+            rows.append(row)
+        else:
+            todo.append(path)
+    workers = workers or os.cpu_count() or 1
+    print(f"{len(paths)} files, {len(rows)} unchanged, analysing {len(todo)} with {workers} workers")
+
+    failed = []
+    start = time.perf_counter()
+    if todo:
+        # spawn: no copy of the parent's (possibly large) memory per worker
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(min(workers, len(todo)), mp_context=context, initializer=_init_worker) as pool:
+            jobs = {pool.submit(analyze_file, path, sr): path for path in todo}
+            for done, job in enumerate(as_completed(jobs), 1):
+                path = jobs[job]
+                try:
+                    rows.append(job.result())
+                except Exception as e:
+                    failed.append(path)
+                    print(f"Error: {path}: {str(e) or type(e).__name__}")
+                elapsed = time.perf_counter() - start
+                remaining = elapsed / done * (len(todo) - done)
+                print(f"[{done}/{len(todo)}] {os.path.basename(path)} "
+                      f"({elapsed:.1f}s elapsed, ~{remaining:.0f}s left)")
+
+    rows.sort(key=lambda row: row['path'])
+    write_rows(rows, out)
+    print(f"Wrote {len(rows)} rows to {out} in {time.perf_counter() - start:.1f}s"
+          + (f", {len(failed)} failed" if failed else ""))
+    return out, rows, failed
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    run(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'beats_library', workers)
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+
+# Persistent cache of decoded audio and analysis results, keyed by the
+# content of the file (so a renamed or copied track still hits, and an
+# edited one misses):
+#   <cache>/<hash[:2]>/<hash>/pcm_<sr>.npy              decoded, resampled mono PCM (float32)
+#   <cache>/<hash[:2]>/<hash>/<feature>_<params>.npz    compressed feature arrays
+# PCM is opened memory-mapped, so a hit costs neither decoding nor
+# resampling nor a full read. <params> holds sr, hop length, n_fft, fmin and
+# fmax. Whole entries are evicted least recently used first once the cache
+# is over its size limit.
+#
+# AUDIO_CACHE_DIR (empty disables it) and AUDIO_CACHE_MB configure the
+# default cache used by audio_analysis.analyze. By default it lives in the
+# user's cache directory, outside the source tree.
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                 'beatab', 'audio_cache')
+DEFAULT_CACHE_MB = 2048
+HASH_BLOCK = 1024 * 1024
+
+
+def params_key(sr, hop_length, n_fft, fmin, fmax):
+    return f"sr{sr}_hop{hop_length}_fft{n_fft}_fmin{fmin:.2f}_fmax{fmax:.2f}"
+
+
+class AudioCache:
+    """
+    One cache directory, shared safely by several processes: files are
+    written under a temporary name and renamed into place
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hashes = {}  # (realpath, size, mtime_ns) -> content hash
+        self.counts = {'pcm_hits': 0, 'pcm_misses': 0, 'feature_hits': 0, 'feature_misses': 0,
+                       'evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_hash(self, audio_path):
+        """
+        Content hash of audio_path, computed once per version of the file
+        """
+        stat = os.stat(audio_path)
+        key = (os.path.realpath(audio_path), stat.st_size, stat.st_mtime_ns)
+        digest = self.hashes.get(key)
+        if digest is None:
+            h = hashlib.blake2b(digest_size=16)
+            with open(audio_path, 'rb') as f:
+                for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                    h.update(block)
+            digest = h.hexdigest()
+            self.hashes[key] = digest
+        return digest
+
+    def entry_dir(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def touch(self, digest):
+        # An entry's mtime is its last use, for eviction
+        try:
+            os.utime(self.entry_dir(digest))
+        except OSError:
+            pass
+
+    def write(self, path, save):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            save(f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def load_pcm(self, audio_path, sr):
+        """
+        (y, sr) of audio_path resampled to sr (None keeps the file's rate);
+        y is memory-mapped when it comes from the cache
+        """
+        import librosa
+
+        if sr is None:
+            sr = librosa.get_samplerate(audio_path)
+        digest = self.file_hash(audio_path)
+        path = os.path.join(self.entry_dir(digest), f'pcm_{sr}.npy')
+        if os.path.exists(path):
+            try:
+                y = np.load(path, mmap_mode='r')
+                self.count('pcm_hits')
+                self.touch(digest)
+                return y, sr
+            except (OSError, ValueError):
+                pass  # evicted meanwhile, or a torn file: decode again
+        self.count('pcm_misses')
+        y, sr = librosa.load(audio_path, sr=sr)
+        self.write(path, lambda f: np.save(f, y.astype('float32', copy=False)))
+        return y, sr
+
+    def load_features(self, digest, name, params):
+        """
+        Dict of the arrays saved under name for these params, or None
+        """
+        path = os.path.join(self.entry_dir(digest), f'{name}_{params}.npz')
+        try:
+            with np.load(path) as data:
+                arrays = {key: data[key] for key in data.files}
+        except (OSError, ValueError):
+            self.count('feature_misses')
+            return None
+        self.count('feature_hits')
+        self.touch(digest)
+        return arrays
+
+    def save_features(self, digest, name, params, arrays):
+        path = os.path.join(self.entry_dir(digest), f'{name}_{params}.npz')
+        self.write(path, lambda f: np.savez_compressed(f, **arrays))
+
+    def entries(self):
+        """
+        (last use, bytes, path) of every entry
+        """
+        found = []
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    found.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    continue  # removed by another process
+        return found
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # Open memory maps of the files stay valid after removal
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.count('evictions')
+
+    def stats(self):
+        entries = self.entries()
+        with self.lock:
+            counts = dict(self.counts)
+        return {**counts, 'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    The cache configured by AUDIO_CACHE_DIR / AUDIO_CACHE_MB, or None when
+    AUDIO_CACHE_DIR is set to an empty string
+    """
+    global _default
+    cache_dir = os.environ.get('AUDIO_CACHE_DIR', DEFAULT_CACHE_DIR)
+    if not cache_dir:
+        return None
+    with _default_lock:
+        if _default is None or _default.cache_dir != cache_dir:
+            max_mb = float(os.environ.get('AUDIO_CACHE_MB', DEFAULT_CACHE_MB))
+            _default = AudioCache(cache_dir, int(max_mb * 1024 * 1024))
+        return _default
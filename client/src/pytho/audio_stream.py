@@ -0,0 +1,165 @@
+import sys
+
+import librosa
+import numpy as np
+
+from audio_analysis import HOP_LENGTH, N_FFT
+
+# Streaming tempo / beat / onset analysis for recordings too long to decode
+# at once (hour-long sets, stems). The file is read in fixed-size blocks of
+# STFT frames (librosa.stream, soundfile underneath), the onset envelope is
+# extended block by block, and events are yielded as soon as they are
+# certain:
+#   {'type': 'onset', 'time': s}
+#   {'type': 'beat', 'time': s}
+#   {'type': 'tempo', 'time': s, 'bpm': x}     running estimate
+# Only the last `window` seconds of the envelope are kept, so memory does
+# not grow with the length of the file.
+#
+# The audio is analysed at the file's own sample rate, and the dB floor
+# follows the loudest frame read so far instead of the loudest of the whole
+# file, so times and tempo are close to, not identical with, those of
+# audio_analysis.TrackAnalysis.
+
+
+class StreamingAnalyzer:
+    """
+    Feed it blocks of STFT frames (push) and collect the events they settle
+    """
+
+    def __init__(self, sr, hop_length=HOP_LENGTH, n_fft=N_FFT, window=8.0, tempo_every=2.0):
+        self.sr = sr
+        self.hop_length = hop_length
+        self.n_fft = n_fft
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft)
+        frames_per_second = sr / hop_length
+        # librosa.onset.onset_detect's peak-picking defaults, in frames
+        self.pre_max = int(0.03 * frames_per_second)
+        self.post_max = 1
+        self.pre_avg = int(0.10 * frames_per_second)
+        self.post_avg = int(0.10 * frames_per_second) + 1
+        self.wait = int(0.03 * frames_per_second)
+        self.delta = 0.07
+        self.window = max(int(window * frames_per_second), 4 * self.pre_avg)
+        self.tempo_every = int(tempo_every * frames_per_second)
+        # Beats closer than this to the end of the envelope may still move
+        self.beat_guard = int(1.0 * frames_per_second)
+
+        self.envelope = np.zeros(0, dtype='float32')  # last `window` frames
+        self.start = 0  # absolute frame index of envelope[0]
+        self.previous = None  # last mel frame (dB) of the previous block
+        self.max_power = 0.0
+        self.peak = 1e-6  # running maximum of the envelope, for normalizing
+        self.onsets_until = 0  # frames before this have been peak-picked
+        self.last_onset = -self.wait - 1
+        self.last_tempo_at = 0
+        self.last_beat = -1
+        self.bpm = None
+
+    @property
+    def frames(self):
+        return self.start + len(self.envelope)
+
+    def frame_time(self, frame):
+        # Frames are not centered (center=False), so a frame's time is its middle
+        return (frame * self.hop_length + self.n_fft / 2) / self.sr
+
+    def push(self, block):
+        """
+        Add a block of samples (a whole number of hops plus n_fft - hop of
+        overlap, as librosa.stream yields them); returns the new events
+        """
+        magnitude = np.abs(librosa.stft(block, n_fft=self.n_fft, hop_length=self.hop_length, center=False))
+        mel = self.mel_basis @ magnitude ** 2
+        # power_to_db's 80 dB floor, below the loudest frame so far rather
+        # than the loudest of the whole file
+        self.max_power = max(self.max_power, float(mel.max(initial=0.0)))
+        mel_db = np.maximum(librosa.power_to_db(mel, top_db=None), 10 * np.log10(max(self.max_power, 1e-10)) - 80)
+        if self.previous is None:
+            # The very first frame has nothing before it
+            flux = np.concatenate([[0.0], np.maximum(0.0, np.diff(mel_db, axis=1)).mean(axis=0)])
+        else:
+            flux = np.maximum(0.0, np.diff(np.hstack([self.previous, mel_db]), axis=1)).mean(axis=0)
+        self.previous = mel_db[:, -1:]
+
+        self.envelope = np.concatenate([self.envelope, flux.astype('float32')])
+        if len(self.envelope) > self.window:
+            drop = len(self.envelope) - self.window
+            self.envelope = self.envelope[drop:]
+            self.start += drop
+        self.peak = max(self.peak, float(flux.max(initial=0.0)))
+
+        events = self.pick_onsets(final=False)
+        if self.frames - self.last_tempo_at >= self.tempo_every:
+            events += self.track_beats(final=False)
+        return events
+
+    def finish(self):
+        """
+        Events held back for lack of look-ahead, once the audio has ended
+        """
+        return self.pick_onsets(final=True) + self.track_beats(final=True)
+
+    def pick_onsets(self, final):
+        decided = self.frames if final else self.frames - self.post_avg
+        if decided <= self.onsets_until:
+            return []
+        normalized = self.envelope / self.peak
+        peaks = librosa.util.peak_pick(normalized, pre_max=self.pre_max, post_max=self.post_max,
+                                       pre_avg=self.pre_avg, post_avg=self.post_avg,
+                                       delta=self.delta, wait=self.wait)
+        events = []
+        for frame in peaks + self.start:
+            if self.onsets_until <= frame < decided and frame > self.last_onset + self.wait:
+                events.append({'type': 'onset', 'time': round(self.frame_time(frame), 3)})
+                self.last_onset = frame
+        self.onsets_until = decided
+        return events
+
+    def track_beats(self, final):
+        # No new frames since the last estimate (the audio ended right on
+        # one): same tempo, only the held-back beats are still to send
+        fresh = self.frames != self.last_tempo_at
+        self.last_tempo_at = self.frames
+        if len(self.envelope) < 2 * self.pre_avg:
+            return []
+        if fresh or self.bpm is None:
+            self.bpm = float(librosa.feature.tempo(onset_envelope=self.envelope, sr=self.sr,
+                                                   hop_length=self.hop_length)[0])
+        events = []
+        if fresh:
+            events.append({'type': 'tempo', 'time': round(self.frame_time(self.frames), 3),
+                           'bpm': round(self.bpm, 2)})
+        _, beats = librosa.beat.beat_track(onset_envelope=self.envelope, sr=self.sr, hop_length=self.hop_length,
+                                           bpm=self.bpm, trim=False)
+        decided = self.frames if final else self.frames - self.beat_guard
+        # Beats re-tracked over an overlapping window are kept only when
+        # clearly after the last one sent (half a beat period)
+        spacing = 0.5 * 60.0 * self.sr / self.hop_length / self.bpm
+        for frame in beats + self.start:
+            if frame < decided and frame > self.last_beat + spacing:
+                events.append({'type': 'beat', 'time': round(self.frame_time(frame), 3)})
+                self.last_beat = frame
+        return events
+
+
+def stream_events(audio_path, block_length=64, hop_length=HOP_LENGTH, n_fft=N_FFT, window=8.0, tempo_every=2.0):
+    """
+    Yield onset / beat / tempo events of audio_path while it is being read;
+    block_length is the number of STFT frames read at a time
+    """
+    sr = librosa.get_samplerate(audio_path)
+    analyzer = StreamingAnalyzer(sr, hop_length, n_fft, window, tempo_every)
+    for block in librosa.stream(audio_path, block_length=block_length, frame_length=n_fft,
+                                hop_length=hop_length, mono=True, fill_value=0):
+        yield from analyzer.push(block)
+    yield from analyzer.finish()
+
+
+if __name__ == "__main__":
+    # Usage: python audio_stream.py long_set.wav
+    for event in stream_events(sys.argv[1]):
+        if event['type'] == 'tempo':
+            print(f"{event['time']:9.3f}s  tempo {event['bpm']} BPM")
+        else:
+            print(f"{event['time']:9.3f}s  {event['type']}")
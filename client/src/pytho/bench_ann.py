@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ann_index import ANN_DIR, IVFIndex, ann_matches
+from embedding_store import EmbeddingStore
+from similarity import SimilarityEngine
+
+# Recall@10 and latency of the IVF index against exact search.
+# Usage: python bench_ann.py glove_en_store [queries] [nprobe,nprobe,...] [out.json]
+# Uses the saved index in glove_en_store/ann, or builds a temporary one.
+
+
+def recall_at(exact, approx):
+    if not exact:
+        return 1.0
+    return len({w for w, _ in exact} & {w for w, _ in approx}) / len(exact)
+
+
+def run(store_dir, queries=500, nprobes=(1, 2, 4, 8, 16, 32, 64), top_n=10, seed=0):
+    store = EmbeddingStore(store_dir)
+    engine = SimilarityEngine.from_embeddings(store)
+    if ann_matches(store_dir):
+        index = IVFIndex.load(os.path.join(store_dir, ANN_DIR))
+    else:
+        start = time.perf_counter()
+        index = IVFIndex.build(engine.unit)
+        print(f"Built temporary index with {index.nlist} lists in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(seed)
+    sample = [engine.words[i] for i in rng.choice(len(engine.words), min(queries, len(engine.words)), replace=False)]
+
+    engine.ann = None
+    start = time.perf_counter()
+    exact = [engine.top_k(word, top_n) for word in sample]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    results = {'words': len(engine.words), 'nlist': index.nlist, 'queries': len(sample),
+               'pq': index.codes is not None, 'exact_ms': exact_ms, 'runs': []}
+    print(f"exact: {exact_ms:.3f} ms/query over {len(engine.words)} words")
+    engine.ann = index
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        index.nprobe = nprobe
+        start = time.perf_counter()
+        approx = [engine.top_k(word, top_n) for word in sample]
+        ms = (time.perf_counter() - start) * 1000 / len(sample)
+        recall = float(np.mean([recall_at(e, a) for e, a in zip(exact, approx)]))
+        results['runs'].append({'nprobe': nprobe, 'recall_at_10': recall, 'ms': ms})
+        print(f"nprobe={nprobe:4d}  recall@{top_n}={recall:.3f}  {ms:.3f} ms/query  ({exact_ms / ms:.1f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    store_dir = sys.argv[1]
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    nprobes = [int(x) for x in sys.argv[3].split(',')] if len(sys.argv) > 3 else (1, 2, 4, 8, 16, 32, 64)
+    results = run(store_dir, queries, nprobes)
+    if len(sys.argv) > 4:
+        with open(sys.argv[4], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from block_corpus import BlockCorpus
+from build_resources import bundle_paths, ensure_pron_store
+from embedding_store import build_store
+
+# Startup and load benchmark for wordgen.py, run offline against a small
+# synthetic fixture (GloVe-format vectors, pronunciations and a Farsi corpus
+# written to a temporary resource bundle):
+#   - cold start: import of wordgen to the first 200 from /get-reply, and RSS
+#     before the import and once everything is loaded, measured in a fresh
+#     interpreter that does nothing else (the fixture is built in this one)
+#   - per-call latency of find_similar_words, find_rhymes, and of the Farsi
+#     path /get-reply-fa serves from: opening the BlockCorpus, random_block,
+#     and the Farsi index's neighbours and rhymes
+#   - p50/p95/p99 latency and requests/sec of /get-reply and /get-reply-fa at
+#     several concurrency levels, against a uvicorn server in this process
+# Usage: python bench_wordgen.py [out.json] [words] [concurrency,concurrency,...]
+
+# Syllables of the fixture words with their ARPAbet, so the words rhyme
+ONSETS = [('b', 'B'), ('d', 'D'), ('f', 'F'), ('g', 'G'), ('k', 'K'), ('l', 'L'), ('m', 'M'),
+          ('n', 'N'), ('p', 'P'), ('r', 'R'), ('s', 'S'), ('t', 'T'), ('v', 'V'), ('z', 'Z')]
+NUCLEI = [('a', 'AE'), ('e', 'EH'), ('i', 'IH'), ('o', 'OW'), ('u', 'UW'), ('ai', 'AY'), ('ee', 'IY')]
+CODAS = [('', None), ('n', 'N'), ('t', 'T'), ('st', 'S T'), ('ck', 'K'), ('m', 'M')]
+FARSI_LETTERS = 'ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی'
+
+
+def fixture_words(count, rng):
+    """
+    count distinct (word, pronunciation) pairs
+    """
+    found = {}
+    while len(found) < count:
+        letters, phones = '', []
+        for k in range(rng.randint(1, 3)):
+            onset, nucleus, coda = rng.choice(ONSETS), rng.choice(NUCLEI), rng.choice(CODAS)
+            letters += onset[0] + nucleus[0] + coda[0]
+            phones += [onset[1], nucleus[1] + ('1' if k == 0 else '0')] + (coda[1].split() if coda[1] else [])
+        found.setdefault(letters, phones)
+    return list(found.items())
+
+
+def write_fixture(resources_dir, corpus_path, words=5000, dim=50, blocks=2000, seed=0):
+    """
+    A complete resource bundle (see build_resources.py) plus a Farsi corpus
+    """
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed).standard_normal((words, dim)).astype('float32')
+    entries = fixture_words(words, rng)
+    os.makedirs(resources_dir, exist_ok=True)
+    store_dir, cmudict_path = bundle_paths(resources_dir)
+    glove_path = os.path.join(resources_dir, 'glove.fixture.txt')
+    with open(glove_path, 'w', encoding='utf-8') as f:
+        for (word, _), vector in zip(entries, vectors):
+            f.write(word + ' ' + ' '.join(f'{x:.5f}' for x in vector) + '\n')
+    with open(cmudict_path, 'w', encoding='utf-8') as f:
+        for word, phones in entries:
+            f.write(word + ' ' + ' '.join(phones) + '\n')
+    build_store(glove_path, store_dir)
+    ensure_pron_store(resources_dir)
+
+    farsi = [''.join(rng.choice(FARSI_LETTERS) for _ in range(rng.randint(2, 6))) for _ in range(3000)]
+    with open(corpus_path, 'w', encoding='utf-8') as f:
+        for _ in range(blocks):
+            f.write('\n'.join(rng.choice(farsi) for _ in range(rng.randint(2, 6))) + '\n\n')
+
+
+def rss_mb():
+    """
+    Resident set size of this process (Linux), or peak RSS elsewhere
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Run by cold_start in a child interpreter: only the standard library is
+# loaded before wordgen is imported. Prints one JSON line.
+COLD_START = """
+import json, os, sys, threading, time, urllib.error, urllib.request
+
+def rss_mb():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def status(method, url):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=60) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+rss_before = rss_mb()
+start = time.perf_counter()
+import wordgen
+import_s = time.perf_counter() - start
+
+import uvicorn
+base = 'http://127.0.0.1:' + sys.argv[1]
+server = uvicorn.Server(uvicorn.Config(wordgen.app, host='127.0.0.1', port=int(sys.argv[1]), log_level='warning'))
+threading.Thread(target=server.run, daemon=True).start()
+# Warm-up answers 503 until the stores are loaded
+while status('POST', base + '/get-reply') != 200:
+    time.sleep(0.01)
+first_reply_s = time.perf_counter() - start
+while status('GET', base + '/ready') != 200:
+    time.sleep(0.01)
+print(json.dumps({'import_s': import_s, 'first_reply_s': first_reply_s,
+                  'rss_before_import': rss_before, 'rss_loaded': rss_mb()}), flush=True)
+os._exit(0)
+"""
+
+
+def cold_start():
+    """
+    Import and first-reply times and RSS of wordgen in a new process, with
+    the configuration in os.environ
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    child = subprocess.run([sys.executable, '-c', COLD_START, str(free_port())], cwd=here,
+                           capture_output=True, text=True, timeout=600)
+    if child.returncode != 0:
+        raise RuntimeError(f"Cold-start child failed: {child.stderr[-2000:]}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def summarize(latencies_ms):
+    values = np.asarray(latencies_ms)
+    return {
+        'calls': len(values),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p95_ms': round(float(np.percentile(values, 95)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+    }
+
+
+def time_calls(fn, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def load_test(url, concurrency, requests):
+    """
+    requests POSTs to url from concurrency clients at once
+    """
+    import httpx
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client(session):
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await session.post(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return dict(summarize(latencies), concurrency=concurrency, errors=errors,
+                requests_per_s=round(requests / elapsed, 1))
+
+
+def run(words=5000, concurrency=(1, 4, 16, 64), requests=500, calls=300, seed=0):
+    work_dir = tempfile.mkdtemp(prefix='bench_wordgen_')
+    try:
+        resources_dir = os.path.join(work_dir, 'resources')
+        corpus_path = os.path.join(work_dir, 'big.txt')
+        write_fixture(resources_dir, corpus_path, words, seed=seed)
+        # wordgen.py reads its configuration at import
+        os.environ['WORDGEN_RESOURCES'] = resources_dir
+        os.environ['WORDGEN_FA_CORPUS'] = corpus_path
+        return run_against(corpus_path, concurrency, requests, calls, seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_against(corpus_path, concurrency, requests, calls, seed):
+    import httpx
+    import uvicorn
+
+    cold = cold_start()
+    import wordgen
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(wordgen.app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{port}'
+    # Warm-up answers 503 until the stores are loaded; the Farsi index comes last
+    with httpx.Client(timeout=60) as session:
+        while True:
+            try:
+                if session.get(base + '/ready').status_code == 200 and wordgen.fa_index is not None:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+    results = {
+        'fixture': {'words': len(wordgen.embeddings), 'farsi_blocks': len(wordgen.blocks)},
+        'cold_start': {'import_s': round(cold['import_s'], 3), 'first_reply_s': round(cold['first_reply_s'], 3)},
+        'rss_mb': {'before_import': round(cold['rss_before_import'], 1), 'loaded': round(cold['rss_loaded'], 1),
+                   'bench_process': round(rss_mb(), 1)},
+        'calls': {},
+        'endpoints': {},
+    }
+
+    rng = random.Random(seed)
+    sample = [(rng.choice(wordgen.embeddings.words),) for _ in range(calls)]
+    results['calls']['find_similar_words'] = time_calls(wordgen.find_similar_words, sample)
+    results['calls']['find_rhymes'] = time_calls(wordgen.find_rhymes, sample)
+    results['calls']['open_block_corpus'] = time_calls(BlockCorpus, [(corpus_path,)] * 5)
+    results['calls']['random_block'] = time_calls(wordgen.blocks.random_block, [()] * calls)
+    fa_sample = [(rng.choice(wordgen.fa_index.words),) for _ in range(calls)]
+    results['calls']['fa_neighbours'] = time_calls(wordgen.fa_index.neighbours, fa_sample)
+    results['calls']['fa_rhymes'] = time_calls(wordgen.fa_index.rhymes, fa_sample)
+
+    for endpoint in ('/get-reply', '/get-reply-fa'):
+        results['endpoints'][endpoint] = [asyncio.run(load_test(base + endpoint, c, requests))
+                                          for c in concurrency]
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    return results
+
+
+if __name__ == "__main__":
+    out_path = sys.argv[1] if len(sys.argv) > 1 else 'bench_wordgen.json'
+    words = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    concurrency = [int(x) for x in sys.argv[3].split(',')] if len(sys.argv) > 3 else (1, 4, 16, 64)
+    results = run(words, concurrency)
+    for endpoint, runs in results['endpoints'].items():
+        for r in runs:
+            print(f"{endpoint:14s} c={r['concurrency']:3d}  p50={r['p50_ms']:.2f}ms  p95={r['p95_ms']:.2f}ms  "
+                  f"p99={r['p99_ms']:.2f}ms  {r['requests_per_s']} req/s")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out_path}")
@@ -0,0 +1,93 @@
+import json
+import mmap
+import os
+import random
+
+import numpy as np
+
+
+class BlockCorpus:
+    """
+    Random access to the blocks of a corpus file (blocks are runs of
+    non-empty lines separated by blank lines; lines are stripped).
+
+    Only the byte range of every block is kept, as an (n, 2) int64 array;
+    the text itself stays in a read-only memory map and a block is decoded
+    when it is asked for. The offsets are saved next to the corpus
+    (<corpus>.blocks.npy) and rebuilt whenever the corpus file changes.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        stat = os.stat(path)
+        self.signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.offsets = self.load_offsets()
+        with open(path, "rb") as f:
+            # mmap cannot map an empty file
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+    def index_paths(self):
+        return self.path + ".blocks.npy", self.path + ".blocks.json"
+
+    def load_offsets(self):
+        offsets_path, meta_path = self.index_paths()
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == self.signature:
+                    return np.load(offsets_path)
+        except (OSError, ValueError):
+            pass
+        offsets = self.build_offsets()
+        try:
+            np.save(offsets_path, offsets)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.signature, f)
+        except OSError as e:
+            print(f"Could not save block index for {self.path}: {e}")
+        return offsets
+
+    def build_offsets(self):
+        """
+        One pass over the file recording where every block starts and ends
+        """
+        spans = []
+        start = end = None
+        position = 0
+        with open(self.path, "rb") as f:
+            for raw_line in f:
+                if raw_line.decode(self.encoding).strip() == "":
+                    if start is not None:
+                        spans.append((start, end))
+                        start = None
+                else:
+                    if start is None:
+                        start = position
+                    end = position + len(raw_line)
+                position += len(raw_line)
+        if start is not None:
+            spans.append((start, end))
+        return np.array(spans, dtype='int64').reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i]
+        text = self.data[start:end].decode(self.encoding)
+        # Only '\n' ends a line, as in build_offsets (splitlines would also
+        # split on form feeds, \x1c-\x1e, \x85, \u2028...)
+        return [line.strip() for line in text.split('\n') if line.strip()]
+
+    def random_block(self):
+        """
+        One block chosen uniformly at random: a seek and a decode
+        """
+        return self[random.randrange(len(self.offsets))]
+
+    def is_stale(self):
+        """
+        True if the file on disk no longer matches what was indexed
+        """
+        stat = os.stat(self.path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns} != self.signature
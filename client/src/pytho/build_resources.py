@@ -0,0 +1,140 @@
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from embedding_store import build_store, store_exists
+from pron_store import compile_pronunciations, pron_store_exists
+from rhyme_index import load_pronunciations, save_pronunciations
+
+# Builds the offline resource bundle wordgen.py starts from, so the server
+# itself never needs nltk, a corpus download or the GloVe text file:
+#   <resources>/glove_en_store/   embedding store (see embedding_store.py)
+#   <resources>/cmudict.txt       pronunciations (see rhyme_index.py)
+#   <resources>/cmudict_store/    the same, compiled and memory-mapped (see pron_store.py)
+# Only this step needs internet access (for nltk.download); the compiled
+# pronunciation store is made from cmudict.txt alone.
+#
+# The builders write some files in place, so several processes must not
+# build into the same folder at once: wordgen's workers (and this script)
+# check for and build missing files only while holding build_lock.
+# Directories that serving processes memory-map (the reply table, the Farsi
+# index) are instead built whole under a temporary name and swapped in with
+# replace_dir.
+STORE_DIR = 'glove_en_store'
+CMUDICT_FILE = 'cmudict.txt'
+PRON_STORE_DIR = 'cmudict_store'
+BUILD_LOCK = '.build.lock'
+
+
+@contextmanager
+def build_lock(lock_path):
+    """
+    Exclusive lock on lock_path (created if missing), across processes;
+    waits for the holder to finish
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 s; keep waiting
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def temp_dir_for(target_dir):
+    """
+    A new, empty directory next to target_dir to build its replacement in
+    """
+    parent, name = os.path.split(os.path.abspath(target_dir))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=name + '.', suffix='.tmp', dir=parent)
+
+
+def replace_dir(tmp_dir, target_dir):
+    """
+    Put the finished directory tmp_dir in place of target_dir. The previous
+    target_dir is renamed aside and then deleted, never written over, so a
+    process that has its files memory-mapped keeps reading the old contents
+    (instead of dying of SIGBUS). Callers serialize with build_lock.
+    """
+    old_dir = None
+    if os.path.exists(target_dir):
+        old_dir = f"{target_dir}.{os.getpid()}.old"
+        os.replace(target_dir, old_dir)
+    try:
+        os.replace(tmp_dir, target_dir)
+    except OSError:
+        if old_dir is not None:
+            os.replace(old_dir, target_dir)
+        raise
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def bundle_paths(resources_dir):
+    return os.path.join(resources_dir, STORE_DIR), os.path.join(resources_dir, CMUDICT_FILE)
+
+
+def bundle_exists(resources_dir):
+    store_dir, cmudict_path = bundle_paths(resources_dir)
+    return store_exists(store_dir) and os.path.exists(cmudict_path)
+
+
+def pron_store_path(resources_dir):
+    return os.path.join(resources_dir, PRON_STORE_DIR)
+
+
+def ensure_pron_store(resources_dir):
+    """
+    Compile cmudict.txt into the pronunciation store if that was not done yet
+    """
+    store_dir = pron_store_path(resources_dir)
+    if not pron_store_exists(store_dir):
+        _, cmudict_path = bundle_paths(resources_dir)
+        compile_pronunciations(load_pronunciations(cmudict_path), store_dir)
+    return store_dir
+
+
+def build_bundle(resources_dir, glove_path):
+    import nltk
+    from nltk.corpus import cmudict, words
+
+    nltk.download('cmudict')
+    nltk.download('words')
+    os.makedirs(resources_dir, exist_ok=True)
+    store_dir, cmudict_path = bundle_paths(resources_dir)
+    if not os.path.exists(cmudict_path):
+        save_pronunciations(cmudict.dict(), cmudict_path + '.tmp')
+        os.replace(cmudict_path + '.tmp', cmudict_path)
+    if not store_exists(store_dir):
+        # The english_words filter is applied here, once, instead of at every start
+        build_store(glove_path, store_dir, vocab=set(words.words()))
+    ensure_pron_store(resources_dir)
+
+
+if __name__ == "__main__":
+    # Usage: python build_resources.py glove.6B.300d.txt [resources]
+    glove_path = sys.argv[1]
+    resources_dir = sys.argv[2] if len(sys.argv) > 2 else './resources'
+    with build_lock(os.path.join(resources_dir, BUILD_LOCK)):
+        build_bundle(resources_dir, glove_path)
+    print(f"Resource bundle ready in {resources_dir}")
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+# On-disk layout of a store directory:
+#   vectors.f32  - contiguous float32 matrix, one row per word (row-major)
+#   unit.f32     - the same rows scaled to unit length, for cosine search
+#   words.txt    - the words, one per line, in row order
+#   meta.json    - {"count": rows, "dim": columns, "source": glove file}
+# and, optionally (see quantize_store):
+#   unit.f16                 - unit rows as float16
+#   unit.i8 + unit.i8scale   - unit rows as int8 with one float32 scale per row
+VECTORS_FILE = 'vectors.f32'
+UNIT_FILE = 'unit.f32'
+WORDS_FILE = 'words.txt'
+META_FILE = 'meta.json'
+QUANTIZED_FILES = {'f16': ('unit.f16', None), 'int8': ('unit.i8', 'unit.i8scale')}
+
+
+def store_exists(store_dir):
+    """
+    True if store_dir holds a complete embedding store
+    """
+    return all(os.path.exists(os.path.join(store_dir, name))
+               for name in (VECTORS_FILE, WORDS_FILE, META_FILE))
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def store_key(store_dir):
+    """
+    What identifies a built store: its source file and row count plus a
+    hash of its word list. Files derived from a store (ANN index, reply
+    table) record it, and are not used once the store no longer matches.
+    """
+    with open(os.path.join(store_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return {
+        'source': meta.get('source'),
+        'words': meta['count'],
+        'words_hash': file_hash(os.path.join(store_dir, WORDS_FILE)),
+    }
+
+
+def build_store(glove_path, store_dir, vocab=None, workers=None):
+    """
+    One-time conversion of a GloVe text file into a binary store.
+    If vocab is given, only words whose lowercase form is in vocab are kept
+    (the same filter wordgen.py used to apply at import). The file is
+    parsed in parallel by glove_ingest.py, over `workers` processes.
+    """
+    from glove_ingest import ingest
+
+    os.makedirs(store_dir, exist_ok=True)
+    vectors_path = os.path.join(store_dir, VECTORS_FILE)
+    tmp_path = vectors_path + '.tmp'
+    words, dim = ingest(glove_path, tmp_path, os.path.join(store_dir, UNIT_FILE), vocab, workers)
+
+    with open(os.path.join(store_dir, WORDS_FILE), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(words))
+        f.write('\n')
+    with open(os.path.join(store_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'count': len(words), 'dim': dim,
+                   'source': os.path.basename(glove_path)}, f)
+    # The vectors file is renamed last so a half-written store is never picked up
+    os.replace(tmp_path, vectors_path)
+    return len(words)
+
+
+def quantize_store(store_dir, mode, block_size=16384):
+    """
+    Write a compressed copy of the unit rows: mode 'f16' (half the size) or
+    'int8' (a quarter, each row scaled so its largest component maps to 127)
+    """
+    store = EmbeddingStore(store_dir)
+    unit = store.unit_vectors()
+    vectors_name, scales_name = QUANTIZED_FILES[mode]
+    with open(os.path.join(store_dir, vectors_name + '.tmp'), 'wb') as out:
+        scales = []
+        for start in range(0, store.count, block_size):
+            block = np.asarray(unit[start:start + block_size], dtype='float32')
+            if mode == 'f16':
+                out.write(block.astype('float16').tobytes())
+                continue
+            scale = np.abs(block).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            out.write(np.round(block / scale[:, None]).astype('int8').tobytes())
+            scales.append(scale.astype('float32'))
+    if scales_name:
+        with open(os.path.join(store_dir, scales_name), 'wb') as f:
+            f.write(np.concatenate(scales).tobytes() if scales else b'')
+    os.replace(os.path.join(store_dir, vectors_name + '.tmp'), os.path.join(store_dir, vectors_name))
+
+
+class EmbeddingStore(Mapping):
+    """
+    Read-only word -> vector mapping backed by a memory-mapped matrix.
+    Rows are views into the shared file, so every worker process reuses the
+    same pages from the OS cache.
+    """
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(store_dir, WORDS_FILE), 'r', encoding='utf-8') as f:
+            self.words = f.read().split('\n')[:meta['count']]
+        self.index = {word: row for row, word in enumerate(self.words)}
+        self.vectors = np.memmap(os.path.join(store_dir, VECTORS_FILE), dtype='float32',
+                                 mode='r', shape=(meta['count'], meta['dim']))
+        self.store_dir = store_dir
+        self.count = meta['count']
+        self.dim = meta['dim']
+
+    def unit_vectors(self):
+        """
+        Unit-length rows for cosine search, memory-mapped when the store has
+        them and computed in memory for stores built before unit.f32 existed
+        """
+        unit_path = os.path.join(self.store_dir, UNIT_FILE)
+        if os.path.exists(unit_path):
+            return np.memmap(unit_path, dtype='float32', mode='r', shape=(self.count, self.dim))
+        from similarity import normalize_rows
+        return normalize_rows(self.vectors)
+
+    def quantized_unit(self, mode):
+        """
+        Memory-mapped (vectors, scales) written by quantize_store, or None if
+        the store has no copy in that mode. scales is None for 'f16'.
+        """
+        vectors_name, scales_name = QUANTIZED_FILES[mode]
+        vectors_path = os.path.join(self.store_dir, vectors_name)
+        if not os.path.exists(vectors_path):
+            return None
+        dtype = 'float16' if mode == 'f16' else 'int8'
+        vectors = np.memmap(vectors_path, dtype=dtype, mode='r', shape=(self.count, self.dim))
+        scales = None
+        if scales_name:
+            scales = np.memmap(os.path.join(self.store_dir, scales_name), dtype='float32',
+                               mode='r', shape=(self.count,))
+        return vectors, scales
+
+    def __getitem__(self, word):
+        return self.vectors[self.index[word]]
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def keys(self):
+        return self.index.keys()
+
+
+if __name__ == "__main__":
+    # Usage: python embedding_store.py glove.6B.300d.txt glove_store [--english-only]
+    #        python embedding_store.py --quantize f16|int8 glove_store
+    if sys.argv[1] == '--quantize':
+        quantize_store(sys.argv[3], sys.argv[2])
+        print(f"Wrote {sys.argv[2]} copy of {sys.argv[3]}")
+        sys.exit(0)
+    from_path, to_dir = sys.argv[1], sys.argv[2]
+    vocab = None
+    if '--english-only' in sys.argv[3:]:
+        import nltk
+        from nltk.corpus import words
+        nltk.download('words')
+        vocab = set(words.words())
+    n = build_store(from_path, to_dir, vocab)
+    print(f"Wrote {n} vectors to {to_dir}")
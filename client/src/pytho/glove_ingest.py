@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Parallel conversion of a GloVe-format text file (any dimension, 6B-50d
+# up to 840B-300d) into the binary layout of embedding_store.py.
+#
+# The file is cut into byte ranges at line boundaries. A first parallel
+# pass picks the lines to keep in every range (vocabulary filter, malformed
+# lines) and returns their words, which fixes the row every range starts
+# at; vectors.f32 and unit.f32 are then preallocated at their final size
+# and a second parallel pass parses each range with one vectorized
+# np.fromstring call (line by line for a range holding a field that is not
+# a number) and writes its rows straight into both files.
+# Each process holds one range at a time, so peak memory is about
+# workers * chunk_bytes * a small factor, whatever the size of the file.
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Worker state, set once per process by _init_worker
+_vocab = None
+
+
+def _init_worker(vocab):
+    global _vocab
+    _vocab = vocab
+
+
+def detect_dim(glove_path):
+    """
+    Number of trailing float fields on the first line. Words may contain
+    spaces (840B has tokens like '. . .'), so the fields are counted from
+    the end.
+    """
+    with open(glove_path, 'r', encoding='utf-8') as f:
+        fields = f.readline().rstrip().split(' ')
+    dim = 0
+    for field in reversed(fields[1:]):
+        try:
+            float(field)
+        except ValueError:
+            break
+        dim += 1
+    return dim
+
+
+def chunk_ranges(glove_path, chunk_bytes=CHUNK_BYTES):
+    """
+    (start, end) byte ranges covering the file, each ending after a newline
+    """
+    size = os.path.getsize(glove_path)
+    ranges = []
+    with open(glove_path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_lines(glove_path, start, end, dim):
+    """
+    (word, numeric text) for the kept lines of a byte range. Used by both
+    passes, so they always agree on which lines are rows.
+    """
+    with open(glove_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', errors='replace')
+    kept = []
+    malformed = 0
+    for line in text.split('\n'):
+        parts = line.rstrip().rsplit(' ', dim)
+        if len(parts) != dim + 1:
+            if line.strip():
+                malformed += 1
+            continue
+        word = parts[0]
+        if _vocab is not None and word.lower() not in _vocab:
+            continue
+        kept.append((word, line[len(word) + 1:]))
+    return kept, malformed
+
+
+def scan_chunk(glove_path, start, end, dim):
+    kept, malformed = read_lines(glove_path, start, end, dim)
+    return [word for word, _ in kept], malformed
+
+
+def parse_chunk(glove_path, start, end, dim, row, vectors_path, unit_path, rows_total):
+    """
+    Parse a byte range and write its rows from row onwards
+    """
+    kept, _ = read_lines(glove_path, start, end, dim)
+    if not kept:
+        return 0
+    try:
+        matrix = np.fromstring('\n'.join(numbers for _, numbers in kept), dtype='float32', sep=' ')
+    except ValueError:
+        # NumPy 2 raises on a field that is not a number (older versions
+        # stopped early and returned a short array)
+        matrix = None
+    if matrix is None or matrix.size != len(kept) * dim:
+        # Parse line by line instead, keeping an unreadable row (as zeros)
+        # so the row numbers stay as scanned
+        matrix = np.zeros((len(kept), dim), dtype='float32')
+        for i, (word, numbers) in enumerate(kept):
+            try:
+                matrix[i] = np.array(numbers.split(), dtype='float32')
+            except ValueError:
+                print(f"Unreadable vector for '{word}', stored as zeros.")
+    matrix = matrix.reshape(len(kept), dim)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    for path, block in ((vectors_path, matrix), (unit_path, matrix / norms)):
+        out = np.memmap(path, dtype='float32', mode='r+', shape=(rows_total, dim))
+        out[row:row + len(kept)] = block
+        out.flush()
+        del out
+    return len(kept)
+
+
+def ingest(glove_path, vectors_path, unit_path, vocab=None, workers=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Write the (filtered) vectors of glove_path to vectors_path and their
+    unit-length copies to unit_path; returns (words, dim)
+    """
+    dim = detect_dim(glove_path)
+    ranges = chunk_ranges(glove_path, chunk_bytes)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(vocab,)) as pool:
+        scans = [job.result() for job in [pool.submit(scan_chunk, glove_path, s, e, dim) for s, e in ranges]]
+        words = [word for chunk_words, _ in scans for word in chunk_words]
+        malformed = sum(m for _, m in scans)
+        if malformed:
+            print(f"Skipped {malformed} malformed lines.")
+
+        rows = len(words)
+        for path in (vectors_path, unit_path):
+            with open(path, 'wb') as f:
+                f.truncate(rows * dim * 4)
+        starts = np.cumsum([0] + [len(chunk_words) for chunk_words, _ in scans])
+        jobs = [pool.submit(parse_chunk, glove_path, s, e, dim, int(row), vectors_path, unit_path, rows)
+                for (s, e), row, (chunk_words, _) in zip(ranges, starts, scans) if chunk_words]
+        for job in jobs:
+            job.result()
+    return words, dim
+
+
+if __name__ == "__main__":
+    # Usage: python glove_ingest.py glove.840B.300d.txt glove_store [workers]
+    # (the same as embedding_store.py's build_store, with a worker count)
+    from embedding_store import build_store
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    start = time.perf_counter()
+    n = build_store(sys.argv[1], sys.argv[2], workers=workers)
+    print(f"Wrote {n} vectors to {sys.argv[2]} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,114 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency histogram bucket bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """
+    In-process counters and latency histograms, rendered in the Prometheus
+    text format. Safe to update from the work pool threads.
+
+    Series are identified by a metric name and a tuple of (label, value)
+    pairs; gauges are read at render time from the callables registered
+    with gauge().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {}
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def time(self, name, **labels):
+        """
+        Observe how long the with-block takes (also when it raises)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauge(self, name, read, **labels):
+        """
+        Report read() as name{labels} on every render
+        """
+        self.gauges[(name, tuple(sorted(labels.items())))] = read
+
+    def render(self):
+        """
+        All series in the Prometheus text exposition format
+        """
+        lines = []
+        described = set()
+
+        def header(name, default_kind):
+            if name not in described:
+                described.add(name)
+                kind, text = self.help.get(name, (default_kind, ''))
+                if text:
+                    lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        with self.lock:
+            histograms = {key: (list(h.counts), h.total, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), read in sorted(self.gauges.items(), key=lambda item: item[0]):
+            header(name, 'gauge')
+            lines.append(f'{name}{format_labels(labels)} {float(read())}')
+        return '\n'.join(lines) + '\n'
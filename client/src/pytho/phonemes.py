@@ -0,0 +1,87 @@
+import numpy as np
+
+# Small-integer encoding of ARPAbet phonemes (as used by cmudict) and a
+# precomputed phoneme distance table for near-rhyme scoring.
+#
+# Ids: 0 is padding, then every vowel with each stress marker (0, 1, 2),
+# then the consonants. Everything fits in a uint8.
+
+# Vowel features: (height 0=low..3=high, backness 0=front..2=back, rounded, diphthong)
+VOWELS = {
+    'AA': (0.0, 2.0, 0, 0), 'AE': (0.5, 0.0, 0, 0), 'AH': (1.5, 1.0, 0, 0),
+    'AO': (1.0, 2.0, 1, 0), 'AW': (1.0, 1.5, 1, 1), 'AY': (1.0, 0.5, 0, 1),
+    'EH': (1.5, 0.0, 0, 0), 'ER': (1.5, 1.0, 1, 0), 'EY': (2.0, 0.0, 0, 1),
+    'IH': (2.5, 0.0, 0, 0), 'IY': (3.0, 0.0, 0, 0), 'OW': (2.0, 2.0, 1, 1),
+    'OY': (1.5, 1.5, 1, 1), 'UH': (2.5, 2.0, 1, 0), 'UW': (3.0, 2.0, 1, 0),
+}
+
+# Consonant features: (place 0=bilabial..7=glottal, manner, voiced)
+CONSONANTS = {
+    'B': (0, 'stop', 1), 'P': (0, 'stop', 0), 'M': (0, 'nasal', 1), 'W': (0, 'glide', 1),
+    'F': (1, 'fricative', 0), 'V': (1, 'fricative', 1),
+    'TH': (2, 'fricative', 0), 'DH': (2, 'fricative', 1),
+    'T': (3, 'stop', 0), 'D': (3, 'stop', 1), 'S': (3, 'fricative', 0), 'Z': (3, 'fricative', 1),
+    'N': (3, 'nasal', 1), 'L': (3, 'liquid', 1),
+    'R': (4, 'liquid', 1), 'SH': (4, 'fricative', 0), 'ZH': (4, 'fricative', 1),
+    'CH': (4, 'affricate', 0), 'JH': (4, 'affricate', 1),
+    'Y': (5, 'glide', 1), 'K': (6, 'stop', 0), 'G': (6, 'stop', 1), 'NG': (6, 'nasal', 1),
+    'HH': (7, 'fricative', 0),
+}
+
+PAD = 0
+SYMBOLS = ['']
+for _vowel in VOWELS:
+    SYMBOLS.extend(_vowel + stress for stress in '012')
+SYMBOLS.extend(CONSONANTS)
+PHONEME_IDS = {symbol: i for i, symbol in enumerate(SYMBOLS)}
+
+# Per id: is it a vowel, its stress (-1 for non-vowels) and its base vowel
+# number (1..15, 0 for non-vowels) - used to find syllables and index tails
+IS_VOWEL = np.array([s[:2] in VOWELS and len(s) == 3 for s in SYMBOLS])
+STRESS = np.array([int(s[2]) if IS_VOWEL[i] else -1 for i, s in enumerate(SYMBOLS)], dtype='int8')
+VOWEL_NUMBER = np.array([list(VOWELS).index(s[:2]) + 1 if IS_VOWEL[i] else 0
+                         for i, s in enumerate(SYMBOLS)], dtype='uint8')
+
+
+def encode(pronunciation):
+    """
+    ['K', 'AE1', 'T'] -> array of phoneme ids (uint8)
+    """
+    return np.array([PHONEME_IDS[p] for p in pronunciation], dtype='uint8')
+
+
+def vowel_distance(a, b):
+    if a == b:
+        return 0.0
+    (h1, b1, r1, d1), (h2, b2, r2, d2) = VOWELS[a], VOWELS[b]
+    return min(1.0, 0.2 + abs(h1 - h2) / 3 * 0.5 + abs(b1 - b2) / 2 * 0.4
+               + abs(r1 - r2) * 0.2 + abs(d1 - d2) * 0.2)
+
+
+def consonant_distance(a, b):
+    if a == b:
+        return 0.0
+    (p1, m1, v1), (p2, m2, v2) = CONSONANTS[a], CONSONANTS[b]
+    return min(1.0, 0.15 + 0.35 * (m1 != m2) + 0.3 * min(abs(p1 - p2), 4) / 4 + 0.2 * (v1 != v2))
+
+
+def build_distance_table():
+    """
+    (ids, ids) float32 table: 0 for identical phonemes, small for near ones
+    (same vowel with another stress, voicing-only differences, ...), 1 for
+    a vowel against a consonant or for a phoneme against padding
+    """
+    n = len(SYMBOLS)
+    table = np.ones((n, n), dtype='float32')
+    table[PAD, PAD] = 0.0
+    for i in range(1, n):
+        for j in range(1, n):
+            a, b = SYMBOLS[i], SYMBOLS[j]
+            if IS_VOWEL[i] and IS_VOWEL[j]:
+                table[i, j] = vowel_distance(a[:2], b[:2]) + (0.1 if a[2] != b[2] else 0.0)
+            elif not IS_VOWEL[i] and not IS_VOWEL[j]:
+                table[i, j] = consonant_distance(a, b)
+    return np.minimum(table, 1.0)
+
+
+DISTANCE = build_distance_table()
@@ -0,0 +1,185 @@
+import sys
+import time
+
+import librosa
+import numpy as np
+
+# Fast pitch tracking: a drop-in for librosa.pyin when an f0 per frame is
+# wanted quickly and pYIN's probabilistic voicing / Viterbi smoothing are not
+# needed. Three things make it cheap:
+#   - frames quieter than gate_db below the loudest frame are unvoiced and
+#     never searched (silence between phrases, decays)
+#   - the signal is decimated by the largest power of two that keeps 4x fmax
+#     below the new rate (and divides the hop), so C7 at 22.05 kHz runs at
+#     half the rate and a C5 ceiling at an eighth
+#   - YIN's difference function is computed for a batch of frames at once
+#     with FFTs instead of a loop per frame
+# Output frames line up with pyin's (centered, same hop), so the result
+# drops into the same (time, frequency, note, voiced) DataFrame.
+#
+# Usage: python pitch_fast.py [out.json]
+# compares against pyin on synthetic tones (see report).
+GATE_DB = -40.0
+THRESHOLD = 0.15
+BATCH_FRAMES = 512
+
+
+def decimation(sr, fmax, hop_length):
+    q = 1
+    while sr / (2 * q) >= 4 * fmax and hop_length % (2 * q) == 0:
+        q *= 2
+    return q
+
+
+def yin_batch(frames, min_lag, max_lag, threshold=THRESHOLD):
+    """
+    YIN over the rows of frames (n, frame_length): (period in samples with
+    parabolic refinement, voiced) per row; the period is NaN when no lag
+    dips under threshold
+    """
+    n, width = frames.shape
+    window = width - max_lag
+    size = 1 << int(np.ceil(np.log2(width + window)))
+    # acf[t] = sum_j x[j] x[j + t] over the first `window` samples
+    spectrum = np.fft.rfft(frames, size, axis=1)
+    head = np.fft.rfft(frames[:, :window], size, axis=1)
+    acf = np.fft.irfft(np.conj(head) * spectrum, size, axis=1)[:, :max_lag + 1]
+    energy = np.cumsum(np.pad(frames ** 2, ((0, 0), (1, 0))), axis=1)
+    lags = np.arange(max_lag + 1)
+    shifted = energy[:, lags + window] - energy[:, lags]
+    diff = np.maximum(shifted[:, :1] + shifted - 2 * acf, 0.0)
+
+    # Cumulative mean normalized difference
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * lags[1:] / np.maximum(cumulative, 1e-12)
+
+    # First local minimum under the threshold, between min_lag and max_lag
+    inner = cmnd[:, min_lag:max_lag]
+    is_min = (inner <= cmnd[:, min_lag - 1:max_lag - 1]) & (inner <= cmnd[:, min_lag + 1:max_lag + 1])
+    candidates = is_min & (inner < threshold)
+    voiced = candidates.any(axis=1)
+    lag = np.argmax(candidates, axis=1) + min_lag
+
+    # Sub-sample refinement on the raw difference, which is less skewed than
+    # the normalized one at the short lags of high notes
+    rows = np.arange(n)
+    left, mid, right = diff[rows, lag - 1], diff[rows, lag], diff[rows, lag + 1]
+    curvature = left - 2 * mid + right
+    shift = np.where(np.abs(curvature) > 1e-12, 0.5 * (left - right) / np.where(curvature == 0, 1, curvature), 0.0)
+    period = lag + np.clip(shift, -1, 1)
+    return np.where(voiced, period, np.nan), voiced
+
+
+def fast_pitch(y, sr, fmin, fmax, frame_length=2048, hop_length=512, threshold=THRESHOLD, gate_db=GATE_DB,
+               batch_frames=BATCH_FRAMES):
+    """
+    (f0, voiced_flag) per frame like librosa.pyin (NaN where unvoiced), for
+    the same centered frames
+    """
+    n_frames = 1 + len(y) // hop_length
+    q = decimation(sr, fmax, hop_length)
+    if q > 1:
+        y = librosa.resample(np.asarray(y, dtype='float32'), orig_sr=sr, target_sr=sr // q, res_type='soxr_hq')
+    rate, hop, width = sr / q, hop_length // q, frame_length // q
+    min_lag = max(int(np.floor(rate / fmax)), 1)
+    # One lag beyond fmin's period, so a note right at fmin is still a minimum
+    max_lag = min(int(np.ceil(rate / fmin)) + 1, width // 2 - 1)
+    padded = np.pad(np.asarray(y, dtype='float32'), width // 2)
+    frames = librosa.util.frame(padded, frame_length=width, hop_length=hop, axis=0)[:n_frames]
+
+    # RMS gate: only frames loud enough to carry a pitch are searched. Taken
+    # batch by batch, so only one batch of frames is ever copied to float64
+    rms = np.empty(len(frames))
+    for start in range(0, len(frames), batch_frames):
+        batch = frames[start:start + batch_frames].astype('float64')
+        rms[start:start + len(batch)] = np.sqrt(np.einsum('ij,ij->i', batch, batch) / width)
+    loud = rms >= rms.max(initial=0.0) * 10 ** (gate_db / 20) if len(rms) else rms.astype(bool)
+    loud &= rms > 0
+
+    f0 = np.full(n_frames, np.nan)
+    voiced = np.zeros(n_frames, dtype=bool)
+    rows = np.flatnonzero(loud)
+    for start in range(0, len(rows), batch_frames):
+        batch = rows[start:start + batch_frames]
+        period, ok = yin_batch(frames[batch].astype('float64'), min_lag, max_lag, threshold)
+        f0[batch] = rate / period
+        voiced[batch] = ok
+    # Anything out of range after refinement counts as unvoiced
+    voiced &= (f0 >= fmin * 0.97) & (f0 <= fmax * 1.03)
+    f0[~voiced] = np.nan
+    return f0, voiced
+
+
+def synthetic_tones(sr=22050, seed=0):
+    """
+    Test signal: harmonic notes from C2 to C7 (0.5 s each, some with noise
+    or vibrato), separated by silence; returns (y, true f0 per sample)
+    """
+    rng = np.random.default_rng(seed)
+    pieces, truth = [], []
+    for i, midi in enumerate(range(36, 97, 3)):
+        freq = librosa.midi_to_hz(midi)
+        t = np.arange(int(0.5 * sr)) / sr
+        vibrato = 1 + (0.01 * np.sin(2 * np.pi * 5 * t) if i % 3 == 1 else np.zeros_like(t))
+        phase = 2 * np.pi * np.cumsum(freq * vibrato) / sr
+        tone = sum(np.sin(k * phase) / k for k in range(1, 6) if k * freq * vibrato.max() < sr / 2)
+        tone *= np.minimum(1, np.minimum(t, t[::-1]) / 0.02)  # 20 ms fades
+        if i % 3 == 2:
+            tone += 0.05 * rng.standard_normal(len(t))
+        pieces += [0.3 * tone, np.zeros(int(0.2 * sr))]
+        truth += [freq * vibrato, np.full(int(0.2 * sr), np.nan)]
+    return np.concatenate(pieces).astype('float32'), np.concatenate(truth)
+
+
+def report(sr=22050, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), frame_length=2048,
+           hop_length=512):
+    """
+    Accuracy of fast_pitch and pyin against the known f0 of synthetic_tones,
+    and their run times
+    """
+    y, truth = synthetic_tones(sr)
+    # Reference f0 per (centered) frame; frames near a note edge are left out
+    centers = np.arange(1 + len(y) // hop_length) * hop_length
+    reference = truth[np.minimum(centers, len(truth) - 1)]
+    edges = np.isnan(truth).astype(int)
+    changed = np.convolve(np.abs(np.diff(edges, prepend=edges[0])), np.ones(frame_length), 'same') > 0
+    steady = ~changed[np.minimum(centers, len(truth) - 1)]
+
+    results = {'frames': int(steady.sum()), 'fmin': fmin, 'fmax': fmax}
+    methods = {
+        'pyin': lambda: librosa.pyin(y, fmin=fmin, fmax=fmax, sr=sr, frame_length=frame_length,
+                                     hop_length=hop_length)[:2],
+        'fast': lambda: fast_pitch(y, sr, fmin, fmax, frame_length, hop_length),
+    }
+    for name, run in methods.items():
+        run()  # warm-up (numba, FFT plans)
+        start = time.perf_counter()
+        f0, voiced = run()
+        seconds = time.perf_counter() - start
+        pitched = ~np.isnan(reference) & steady
+        silent = np.isnan(reference) & steady
+        both = pitched & voiced
+        cents = np.abs(1200 * np.log2(f0[both] / reference[both]))
+        results[name] = {
+            'seconds': seconds,
+            'voiced_recall': float(voiced[pitched].mean()),
+            'false_voiced': float(voiced[silent].mean()),
+            'median_cents': float(np.median(cents)),
+            'gross_errors': float((cents > 50).mean()),  # off by more than a quarter tone
+        }
+        print(f"{name}: {seconds * 1000:.0f} ms, voiced recall {results[name]['voiced_recall']:.3f}, "
+              f"false voiced {results[name]['false_voiced']:.3f}, median error "
+              f"{results[name]['median_cents']:.1f} cents, gross errors {results[name]['gross_errors']:.3f}")
+    results['speedup'] = results['pyin']['seconds'] / results['fast']['seconds']
+    print(f"speedup {results['speedup']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    results = report()
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the next N requests: a background thread
+    samples the Python stack of every other thread every interval seconds,
+    and when N requests have finished the samples are written to path as
+    collapsed stacks ("outer;inner;leaf count" per line), the input format
+    of flamegraph.pl and speedscope.
+
+    Only one capture runs at a time. request_done() is cheap when idle, and
+    never blocks: the sampler is stopped and the file written in a thread of
+    their own, so it can be called after every request, on the event loop.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.samples = Counter()
+        self.remaining = 0
+        self.path = None
+        self.interval = 0.005
+
+    def active(self):
+        return self.thread is not None
+
+    def start(self, requests, path, interval=0.005):
+        """
+        Begin a capture of the next requests requests; False if one is running
+        """
+        with self.lock:
+            if self.thread is not None:
+                return False
+            self.samples = Counter()
+            self.remaining = requests
+            self.path = path
+            self.interval = interval
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(self.stopped, self.samples),
+                                           name='profiler', daemon=True)
+            self.thread.start()
+            return True
+
+    def run(self, stopped, samples):
+        own = threading.get_ident()
+        names = {}
+        while not stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                samples[';'.join(reversed(stack))] += 1
+
+    def request_done(self):
+        if self.thread is None:
+            return
+        with self.lock:
+            if self.thread is None:
+                return
+            self.remaining -= 1
+            if self.remaining > 0:
+                return
+            thread, self.thread = self.thread, None
+            stopped, samples, path = self.stopped, self.samples, self.path
+        threading.Thread(target=self.finish, args=(thread, stopped, samples, path),
+                         name='profiler-write', daemon=True).start()
+
+    def finish(self, thread, stopped, samples, path):
+        stopped.set()
+        thread.join()
+        self.write(samples, path)
+
+    def write(self, samples, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in samples.most_common():
+                    f.write(f'{stack} {count}\n')
+            print(f"Profile of {sum(samples.values())} samples written to {path}")
+        except OSError as e:
+            print(f"Error: could not write profile to {path}: {e}")
@@ -0,0 +1,222 @@
+import heapq
+import json
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+from phonemes import SYMBOLS, encode
+from rhyme_index import get_rhyme_part, load_pronunciations
+from rhyme_scoring import WIDTH, RhymeScorer, rhyme_tail
+
+# Compiled pronunciation dictionary in CSR form, memory-mapped from a
+# directory of .npy files, so a worker starts without building cmudict.dict()
+# and shares the pages with every other worker:
+#   words.npy, word_offsets.npy    sorted words: one utf-8 blob + start offsets
+#   word_prons.npy                 word i has pronunciations word_prons[i]:word_prons[i+1]
+#   phones.npy, pron_offsets.npy   phoneme ids (phonemes.py) of every pronunciation
+#   pron_rhymes.npy                rhyme-part id of every pronunciation
+#   rhyme_word_offsets.npy, rhyme_words.npy   rhyme part -> sorted word ids
+#   scorer_*.npy                   the RhymeScorer tables (rhyme_scoring.py)
+#   meta.json
+STORE_FILES = ('words', 'word_offsets', 'word_prons', 'phones', 'pron_offsets',
+               'pron_rhymes', 'rhyme_word_offsets', 'rhyme_words')
+
+
+def csr_offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype='int64')
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def compile_pronunciations(pronunciations, store_dir):
+    """
+    Compile a cmudict-style word -> [pronunciation, ...] mapping into store_dir
+    """
+    words = sorted(pronunciations)
+    encoded = [word.encode('utf-8') for word in words]
+    word_prons = []
+    prons = []
+    pron_words = []
+    pron_rhymes = []
+    # Rhyme parts are numbered in order of first appearance; word ids are
+    # added in increasing order, so every rhyme part's word list is sorted
+    rhyme_ids = {}
+    rhyme_lists = []
+    for word_id, word in enumerate(words):
+        word_prons.append(len(pronunciations[word]))
+        for pron in pronunciations[word]:
+            prons.append(encode(pron))
+            pron_words.append(word_id)
+            rhyme_id = rhyme_ids.setdefault(tuple(get_rhyme_part(pron)), len(rhyme_ids))
+            if rhyme_id == len(rhyme_lists):
+                rhyme_lists.append([])
+            if not rhyme_lists[rhyme_id] or rhyme_lists[rhyme_id][-1] != word_id:
+                rhyme_lists[rhyme_id].append(word_id)
+            pron_rhymes.append(rhyme_id)
+
+    arrays = {
+        'words': np.frombuffer(b''.join(encoded), dtype='uint8'),
+        'word_offsets': csr_offsets([len(b) for b in encoded]),
+        'word_prons': csr_offsets(word_prons),
+        'phones': np.concatenate(prons) if prons else np.zeros(0, dtype='uint8'),
+        'pron_offsets': csr_offsets([len(p) for p in prons]),
+        'pron_rhymes': np.array(pron_rhymes, dtype='int32'),
+        'rhyme_word_offsets': csr_offsets([len(ids) for ids in rhyme_lists]),
+        'rhyme_words': np.array([i for ids in rhyme_lists for i in ids], dtype='int32'),
+    }
+    tails = np.stack([rhyme_tail(p) for p in prons]) if prons else np.zeros((0, WIDTH), dtype='uint8')
+    scorer = RhymeScorer.compile_arrays(tails, np.array(pron_words, dtype='int32'), len(words))
+    arrays.update(('scorer_' + name, array) for name, array in scorer.items())
+
+    os.makedirs(store_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(store_dir, name + '.npy'), array)
+    # meta.json is written last and marks the store as complete
+    with open(os.path.join(store_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'words': len(words), 'pronunciations': len(prons), 'rhyme_parts': len(rhyme_lists)}, f)
+
+
+def pron_store_exists(store_dir):
+    return os.path.exists(os.path.join(store_dir, 'meta.json'))
+
+
+class WordTable:
+    """
+    Sorted words kept as one utf-8 blob plus offsets; a lookup is a binary
+    search that decodes only the words it compares against
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def key(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def __getitem__(self, i):
+        return self.key(i).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def get(self, word, default=None):
+        """
+        Id of word, or default if it is not in the table
+        """
+        target = word.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.key(lo) == target:
+            return lo
+        return default
+
+
+class PronunciationStore(Mapping):
+    """
+    Read-only word -> [pronunciation, ...] mapping over a compiled store,
+    usable wherever cmudict.dict() was
+    """
+
+    def __init__(self, store_dir):
+        def array(name):
+            return np.load(os.path.join(store_dir, name + '.npy'), mmap_mode='r')
+
+        for name in STORE_FILES:
+            setattr(self, name, array(name))
+        self.word_table = WordTable(self.words, self.word_offsets)
+        self.scorer_arrays = {name: array('scorer_' + name) for name in RhymeScorer.ARRAYS}
+        self.store_dir = store_dir
+
+    def word_id(self, word):
+        return self.word_table.get(word)
+
+    def pron_rows(self, word_id):
+        return range(self.word_prons[word_id], self.word_prons[word_id + 1])
+
+    def phones_of(self, row):
+        return self.phones[self.pron_offsets[row]:self.pron_offsets[row + 1]]
+
+    def __getitem__(self, word):
+        word_id = self.word_id(word)
+        if word_id is None:
+            raise KeyError(word)
+        return [[SYMBOLS[p] for p in self.phones_of(row)] for row in self.pron_rows(word_id)]
+
+    def __contains__(self, word):
+        return self.word_id(word) is not None
+
+    def __iter__(self):
+        return iter(self.word_table)
+
+    def __len__(self):
+        return len(self.word_table)
+
+    def rhyme_scorer(self):
+        """
+        A RhymeScorer over the precompiled tables
+        """
+        return RhymeScorer(self.word_table, self.scorer_arrays, ids=self.word_table)
+
+
+class CompiledRhymeIndex:
+    """
+    rhyme_index.RhymeIndex over a PronunciationStore: the rhyme part of every
+    pronunciation and the sorted word list of every rhyme part are read from
+    the store instead of being built at startup
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __contains__(self, word):
+        return word in self.store
+
+    def find(self, word, top_n=10):
+        """
+        Up to top_n words, in alphabetical order, sharing a rhyme part with
+        any pronunciation of word (none if top_n <= 0)
+        """
+        if top_n <= 0:
+            return []
+        word = word.lower()
+        store = self.store
+        word_id = store.word_id(word)
+        if word_id is None:
+            print(f"Phonetic transcription for '{word}' not found.")
+            return []
+
+        parts = []
+        for row in store.pron_rows(word_id):
+            part = int(store.pron_rhymes[row])
+            if part not in parts:
+                parts.append(part)
+        lists = [store.rhyme_words[store.rhyme_word_offsets[p]:store.rhyme_word_offsets[p + 1]] for p in parts]
+
+        rhymes = []
+        previous = None
+        # Word lists are sorted by id (= alphabetically), so merging them
+        # yields a sorted union lazily
+        for candidate in heapq.merge(*lists):
+            if candidate == word_id or candidate == previous:
+                continue
+            rhymes.append(store.word_table[candidate])
+            previous = candidate
+            if len(rhymes) == top_n:
+                break
+        return rhymes
+
+
+if __name__ == "__main__":
+    # Usage: python pron_store.py cmudict.txt cmudict_store
+    compile_pronunciations(load_pronunciations(sys.argv[1]), sys.argv[2])
+    print(f"Compiled {sys.argv[1]} into {sys.argv[2]}")
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+from similarity import SimilarityEngine, normalize_rows
+
+# Reduced-dimension copies of a store's unit matrix, for a cheaper first
+# pass of similarity search (see SimilarityEngine.use_reduced):
+#   <store>/reduced/<method><dim>.f32       rows of unit @ projection, renormalized
+#   <store>/reduced/<method><dim>.proj.npy  (store dim, dim) float32 projection
+# method is 'pca' (top principal directions of the unit rows) or 'random'
+# (a scaled Gaussian random projection, no fitting needed).
+#
+# Usage: python reduced_tier.py glove_en_store [dim,dim,...] [pca|random] [queries] [out.json]
+# builds the copies that are missing and reports top-10 overlap with
+# full-dimension search, with and without re-ranking at full dimension.
+REDUCED_DIR = 'reduced'
+
+
+def reduced_paths(store_dir, dim, method='pca'):
+    base = os.path.join(store_dir, REDUCED_DIR, f'{method}{dim}')
+    return base + '.f32', base + '.proj.npy'
+
+
+def reduced_exists(store_dir, dim, method='pca'):
+    return all(os.path.exists(path) for path in reduced_paths(store_dir, dim, method))
+
+
+def fit_projection(unit, dim, method='pca', sample=100000, seed=0):
+    """
+    (store dim, dim) float32 projection for the rows of unit. PCA is fitted
+    on at most sample rows.
+    """
+    rng = np.random.default_rng(seed)
+    full_dim = unit.shape[1]
+    if method == 'random':
+        return (rng.standard_normal((full_dim, dim)) / np.sqrt(dim)).astype('float32')
+    if method != 'pca':
+        raise ValueError(f"Unknown reduction method '{method}'")
+    rows = np.sort(rng.choice(len(unit), min(sample, len(unit)), replace=False))
+    x = np.asarray(unit[rows], dtype='float64')
+    x -= x.mean(axis=0)
+    # Eigenvectors of the covariance, largest eigenvalues first
+    eigenvalues, eigenvectors = np.linalg.eigh(x.T @ x / len(x))
+    return np.ascontiguousarray(eigenvectors[:, np.argsort(eigenvalues)[::-1][:dim]], dtype='float32')
+
+
+def reduce_store(store_dir, dim, method='pca', block_size=16384):
+    """
+    Fit the projection and write the reduced copy of the unit rows
+    """
+    store = EmbeddingStore(store_dir)
+    unit = store.unit_vectors()
+    projection = fit_projection(unit, dim, method)
+    vectors_path, projection_path = reduced_paths(store_dir, dim, method)
+    os.makedirs(os.path.dirname(vectors_path), exist_ok=True)
+    with open(vectors_path + '.tmp', 'wb') as out:
+        for start in range(0, store.count, block_size):
+            block = np.asarray(unit[start:start + block_size], dtype='float32')
+            out.write(normalize_rows(block @ projection).tobytes())
+    np.save(projection_path, projection)
+    # The rows are renamed last: reduced_exists needs both files
+    os.replace(vectors_path + '.tmp', vectors_path)
+
+
+def load_reduced(store_dir, dim, method='pca'):
+    """
+    Memory-mapped (vectors, projection) written by reduce_store
+    """
+    vectors_path, projection_path = reduced_paths(store_dir, dim, method)
+    projection = np.load(projection_path)
+    count = os.path.getsize(vectors_path) // (4 * dim)
+    return np.memmap(vectors_path, dtype='float32', mode='r', shape=(count, dim)), projection
+
+
+def overlap(exact, approx):
+    if not exact:
+        return 1.0
+    return len({w for w, _ in exact} & {w for w, _ in approx}) / len(exact)
+
+
+def timed(engine, sample, top_n):
+    start = time.perf_counter()
+    results = [engine.top_k(word, top_n) for word in sample]
+    return results, (time.perf_counter() - start) * 1000 / len(sample)
+
+
+def run(store_dir, dims=(16, 32, 64, 128), method='pca', queries=500, rescore=100, top_n=10, seed=0):
+    store = EmbeddingStore(store_dir)
+    engine = SimilarityEngine.from_embeddings(store)
+    rng = np.random.default_rng(seed)
+    sample = [engine.words[i] for i in rng.choice(len(engine.words), min(queries, len(engine.words)), replace=False)]
+    exact, exact_ms = timed(engine, sample, top_n)
+    print(f"full {store.dim}d: {exact_ms:.3f} ms/query over {len(engine.words)} words")
+
+    results = {'words': len(engine.words), 'dim': store.dim, 'method': method, 'queries': len(sample),
+               'rescore': rescore, 'full_ms': exact_ms, 'runs': []}
+    for dim in dims:
+        if dim >= store.dim:
+            break
+        if not reduced_exists(store_dir, dim, method):
+            reduce_store(store_dir, dim, method)
+        vectors, projection = load_reduced(store_dir, dim, method)
+        run_result = {'dim': dim}
+        for label, depth in (('reduced', 0), ('reranked', rescore)):
+            engine.use_reduced(vectors, projection, depth)
+            approx, ms = timed(engine, sample, top_n)
+            run_result[label] = {'overlap_at_10': float(np.mean([overlap(e, a) for e, a in zip(exact, approx)])),
+                                 'ms': ms}
+        results['runs'].append(run_result)
+        print(f"{method}{dim:<4d} overlap@{top_n}: {run_result['reduced']['overlap_at_10']:.3f} "
+              f"({run_result['reduced']['ms']:.3f} ms), re-ranked top {rescore}: "
+              f"{run_result['reranked']['overlap_at_10']:.3f} ({run_result['reranked']['ms']:.3f} ms)")
+    return results
+
+
+if __name__ == "__main__":
+    store_dir = sys.argv[1]
+    dims = [int(x) for x in sys.argv[2].split(',')] if len(sys.argv) > 2 else (16, 32, 64, 128)
+    method = sys.argv[3] if len(sys.argv) > 3 else 'pca'
+    queries = int(sys.argv[4]) if len(sys.argv) > 4 else 500
+    results = run(store_dir, dims, method, queries)
+    if len(sys.argv) > 5:
+        with open(sys.argv[5], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+
+
+class ReplyBuffer:
+    """
+    Bounded ring buffer of ready-made replies kept full by a background
+    producer thread, so a request only has to pop one.
+
+    produce(n) must return a list of n replies. The producer tops the buffer
+    up in batches of at most refill_batch replies and then sleeps
+    refill_interval seconds, which caps how much CPU refilling can take.
+    """
+
+    def __init__(self, produce, depth=64, refill_batch=16, refill_interval=0.01):
+        self.produce = produce
+        self.depth = depth
+        self.refill_batch = refill_batch
+        self.refill_interval = refill_interval
+        self.replies = deque(maxlen=depth)
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+        self.errors = 0
+        self.consumed = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.depth <= 0 or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='reply-buffer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.consumed.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            missing = self.depth - len(self.replies)
+            if missing <= 0:
+                # Full: sleep until a reply is taken
+                self.consumed.wait()
+                self.consumed.clear()
+                continue
+            try:
+                replies = self.produce(min(missing, self.refill_batch))
+            except Exception as e:
+                self.errors += 1
+                print(f"Error: {e}")
+                replies = []
+            # deque.extend / popleft are atomic, so no lock is needed
+            self.replies.extend(replies)
+            self.produced += len(replies)
+            if self.refill_interval:
+                time.sleep(self.refill_interval)
+
+    def pop(self):
+        """
+        The oldest buffered reply, or None if the buffer is empty
+        """
+        try:
+            reply = self.replies.popleft()
+        except IndexError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.consumed.set()
+        return reply
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "buffered": len(self.replies),
+            "hits": self.hits,
+            "misses": self.misses,
+            "produced": self.produced,
+            "errors": self.errors,
+        }
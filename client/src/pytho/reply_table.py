@@ -0,0 +1,196 @@
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from build_resources import BUILD_LOCK, build_lock, bundle_paths, ensure_pron_store, replace_dir, temp_dir_for
+from embedding_store import EmbeddingStore, file_hash, store_key
+from pron_store import CompiledRhymeIndex, PronunciationStore
+from similarity import SimilarityEngine
+
+# The vocabulary /get-reply draws from is fixed, so the top similar words and
+# rhymes of every entry can be computed once, offline, and served by lookup.
+#
+# Saved as <resources>/reply_table/, one row per embedding-store row:
+#   sims_ids.npy / sims_scores.npy        (n, top_n) int32 store rows / float16 similarity
+#   rhyme_ids.npy                         (n, top_n) int32 pron_store word ids ('exact' rhymes)
+#   scored_ids.npy / scored_scores.npy    (n, top_n) int32 word ids / float16 score ('scored' rhymes)
+#   meta.json                             stores it was built against (see stores_key), build time, bytes
+# Rows with fewer than top_n results are padded with -1. A rebuild is written
+# to a temporary directory (meta.json last) and swapped in whole, since
+# serving workers have the previous table memory-mapped.
+TABLE_DIR = 'reply_table'
+TABLE_FILES = ('sims_ids', 'sims_scores', 'rhyme_ids', 'scored_ids', 'scored_scores')
+
+# Worker processes open the pronunciation store once (memory-mapped, so the
+# pages are shared) and reuse it for every chunk
+_worker_store = None
+
+
+def _open_worker_store(pron_store_dir):
+    global _worker_store
+    _worker_store = PronunciationStore(pron_store_dir)
+
+
+def _rhyme_chunk(words, top_n):
+    """
+    Exact and scored rhyme ids (and scores) for a chunk of words
+    """
+    store = _worker_store
+    exact = CompiledRhymeIndex(store)
+    scorer = store.rhyme_scorer()
+    rhyme_ids = np.full((len(words), top_n), -1, dtype='int32')
+    scored_ids = np.full((len(words), top_n), -1, dtype='int32')
+    scored_scores = np.zeros((len(words), top_n), dtype='float16')
+    for i, word in enumerate(words):
+        if word.lower() not in store:
+            continue
+        for j, rhyme in enumerate(exact.find(word, top_n)):
+            rhyme_ids[i, j] = store.word_id(rhyme)
+        for j, (rhyme, score) in enumerate(scorer.find(word, top_n)):
+            scored_ids[i, j] = store.word_id(rhyme)
+            scored_scores[i, j] = score
+    return rhyme_ids, scored_ids, scored_scores
+
+
+def stores_key(store, pronunciations):
+    """
+    What identifies the stores a table was built from: the embedding
+    store's key (embedding_store.store_key), and the size and a hash of the
+    pronunciation store's words. A vocabulary rebuilt from another file of
+    the same size no longer matches.
+    """
+    return {
+        **store_key(store.store_dir),
+        'pron_words': len(pronunciations),
+        'pron_words_hash': file_hash(os.path.join(pronunciations.store_dir, 'words.npy')),
+    }
+
+
+def table_path(resources_dir):
+    return os.path.join(resources_dir, TABLE_DIR)
+
+
+def build_table(resources_dir, top_n=10, block_size=1024, chunk_size=2048, workers=None):
+    """
+    Compute the table for the whole vocabulary of the resource bundle.
+    Rhymes are spread over a process pool while the main process scores the
+    similarities block by block (one matrix-matrix product per block, which
+    BLAS runs on all cores). Returns meta.json's contents.
+    """
+    start = time.perf_counter()
+    store_dir, _ = bundle_paths(resources_dir)
+    with build_lock(os.path.join(resources_dir, BUILD_LOCK)):
+        pron_store_dir = ensure_pron_store(resources_dir)
+    store = EmbeddingStore(store_dir)
+    pronunciations = PronunciationStore(pron_store_dir)
+    # Exact search: the table is built once, so it need not be approximate
+    engine = SimilarityEngine.from_embeddings(store)
+    words = store.words
+    n = len(words)
+
+    with ProcessPoolExecutor(workers, initializer=_open_worker_store, initargs=(pron_store_dir,)) as pool:
+        rhyme_jobs = [pool.submit(_rhyme_chunk, words[i:i + chunk_size], top_n) for i in range(0, n, chunk_size)]
+
+        sims_ids = np.full((n, top_n), -1, dtype='int32')
+        sims_scores = np.zeros((n, top_n), dtype='float16')
+        for block_start in range(0, n, block_size):
+            block = words[block_start:block_start + block_size]
+            for i, sims in enumerate(engine.top_k_batch(block, top_n, block_size)):
+                row = block_start + i
+                for j, (other, score) in enumerate(sims):
+                    sims_ids[row, j] = engine.index[other]
+                    sims_scores[row, j] = score
+
+        parts = [job.result() for job in rhyme_jobs]
+
+    arrays = {
+        'sims_ids': sims_ids,
+        'sims_scores': sims_scores,
+        'rhyme_ids': np.concatenate([p[0] for p in parts]) if parts else np.zeros((0, top_n), dtype='int32'),
+        'scored_ids': np.concatenate([p[1] for p in parts]) if parts else np.zeros((0, top_n), dtype='int32'),
+        'scored_scores': np.concatenate([p[2] for p in parts]) if parts else np.zeros((0, top_n), dtype='float16'),
+    }
+    tmp_dir = temp_dir_for(table_path(resources_dir))
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), array)
+        meta = {
+            **stores_key(store, pronunciations),
+            'top_n': top_n,
+            'build_seconds': round(time.perf_counter() - start, 2),
+            'bytes': sum(os.path.getsize(os.path.join(tmp_dir, name + '.npy')) for name in TABLE_FILES),
+        }
+        # meta.json is written last and marks the table as complete
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        with build_lock(os.path.join(resources_dir, BUILD_LOCK)):
+            replace_dir(tmp_dir, table_path(resources_dir))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return meta
+
+
+class ReplyTable:
+    """
+    Read-only, memory-mapped view of a built table. words / index are the
+    embedding store's (row -> word, word -> row) and pron_words the
+    pronunciation store's word table.
+    """
+
+    def __init__(self, table_dir, words, index, pron_words):
+        with open(os.path.join(table_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        for name in TABLE_FILES:
+            setattr(self, name, np.load(os.path.join(table_dir, name + '.npy'), mmap_mode='r'))
+        self.top_n = self.meta['top_n']
+        self.words = words
+        self.index = index
+        self.pron_words = pron_words
+
+    @staticmethod
+    def matches(table_dir, store, pronunciations):
+        """
+        True if a complete table built from these stores is in table_dir
+        """
+        try:
+            with open(os.path.join(table_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        key = stores_key(store, pronunciations)
+        return all(meta.get(name) == value for name, value in key.items())
+
+    def row(self, word, top_n):
+        """
+        Table row of word, or None if the live path has to answer (unknown
+        word, or more results asked for than were precomputed)
+        """
+        if top_n > self.top_n:
+            return None
+        return self.index.get(word)
+
+    def similar(self, row, top_n=10):
+        ids, scores = self.sims_ids[row, :top_n], self.sims_scores[row, :top_n]
+        # float16 holds about 3 significant digits; more would only be noise
+        return [(self.words[i], round(float(s), 4)) for i, s in zip(ids, scores) if i >= 0]
+
+    def rhymes(self, row, top_n=10, mode='exact'):
+        if mode == 'scored':
+            ids, scores = self.scored_ids[row, :top_n], self.scored_scores[row, :top_n]
+            return [(self.pron_words[i], round(float(s), 3)) for i, s in zip(ids, scores) if i >= 0]
+        return [self.pron_words[i] for i in self.rhyme_ids[row, :top_n] if i >= 0]
+
+
+if __name__ == "__main__":
+    # Usage: python reply_table.py [resources] [top_n]
+    resources_dir = sys.argv[1] if len(sys.argv) > 1 else './resources'
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    meta = build_table(resources_dir, top_n)
+    print(f"Reply table for {meta['words']} words (top {meta['top_n']}) built in "
+          f"{meta['build_seconds']}s, {meta['bytes'] / 1e6:.1f} MB in {table_path(resources_dir)}")
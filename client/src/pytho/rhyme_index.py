@@ -0,0 +1,95 @@
+import heapq
+
+
+def save_pronunciations(pronunciations, path):
+    """
+    Write a word -> [pronunciation, ...] mapping as plain text, one
+    pronunciation per line: "word PH1 PH2 ..."
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for word, prons in pronunciations.items():
+            for pron in prons:
+                f.write(word + ' ' + ' '.join(pron) + '\n')
+
+
+def load_pronunciations(path):
+    """
+    Read a file written by save_pronunciations back into a dict shaped like
+    cmudict.dict(), without needing nltk or its corpus download
+    """
+    pronunciations = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            values = line.split()
+            if values:
+                pronunciations.setdefault(values[0], []).append(values[1:])
+    return pronunciations
+
+
+def get_rhyme_part(pronunciation):
+    """
+    Extract the rhyme part (from the last stressed vowel to the end)
+    """
+    # Find the position of the last stressed vowel
+    for i in range(len(pronunciation)-1, -1, -1):
+        # The stress markers are '1' for primary stress, '2' for secondary
+        if pronunciation[i][-1] in ('1', '2'):
+            return pronunciation[i:]
+    # If no stressed vowel, return last part
+    return pronunciation[-1:]
+
+
+class RhymeIndex:
+    """
+    Maps every rhyme part (as a tuple of phonemes) to the sorted list of words
+    that have a pronunciation ending in it. Built once from a cmudict-style
+    word -> [pronunciation, ...] mapping; a lookup then only touches the
+    buckets of the query word, whatever the size of the dictionary.
+    """
+
+    def __init__(self, pronunciations):
+        self.pronunciations = pronunciations
+        buckets = {}
+        for word, prons in pronunciations.items():
+            for pron in prons:
+                buckets.setdefault(tuple(get_rhyme_part(pron)), set()).add(word)
+        # Sorted buckets make the results deterministic
+        self.buckets = {part: sorted(words) for part, words in buckets.items()}
+
+    def __contains__(self, word):
+        return word in self.pronunciations
+
+    def rhyme_parts(self, word):
+        """
+        The distinct rhyme parts of all pronunciations of word, in order
+        """
+        parts = []
+        for pron in self.pronunciations.get(word, ()):
+            part = tuple(get_rhyme_part(pron))
+            if part not in parts:
+                parts.append(part)
+        return parts
+
+    def find(self, word, top_n=10):
+        """
+        Up to top_n words, in alphabetical order, sharing a rhyme part with
+        any pronunciation of word (none if top_n <= 0)
+        """
+        if top_n <= 0:
+            return []
+        word = word.lower()
+        if word not in self.pronunciations:
+            print(f"Phonetic transcription for '{word}' not found.")
+            return []
+
+        rhymes = []
+        previous = None
+        # Buckets are sorted, so merging them yields a sorted union lazily
+        for candidate in heapq.merge(*(self.buckets[part] for part in self.rhyme_parts(word))):
+            if candidate == word or candidate == previous:
+                continue
+            rhymes.append(candidate)
+            previous = candidate
+            if len(rhymes) == top_n:
+                break
+        return rhymes
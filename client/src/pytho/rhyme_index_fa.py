@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import sys
+from bisect import bisect_left
+
+import numpy as np
+
+from build_resources import replace_dir, temp_dir_for
+
+# Rhymes and neighbours for the Farsi words of a block corpus (big.txt).
+#
+# Rhymes: word ids sorted by their reversed spelling. Words sharing an ending
+# are then contiguous, and the words sharing the longest ending with a query
+# sit right next to where its reversed spelling would be inserted, so a
+# lookup is a binary search plus a walk outwards from that point.
+#
+# Neighbours: words that appear in the same blocks as the query, ranked by
+# how many blocks they share with it.
+#
+# Saved as a directory of .npy files next to the corpus (<corpus>.fa_index/):
+#   words.npy / word_offsets.npy    utf-8 blob of all words + start offsets
+#   rhyme_order.npy                 word ids sorted by reversed spelling
+#   word_block_offsets.npy / word_blocks.npy    word -> block ids (CSR)
+#   block_word_offsets.npy / block_words.npy    block -> word ids (CSR)
+#   meta.json                       corpus size / mtime the index was built from
+# The directory is written under a temporary name, meta.json last, and then
+# swapped in whole: other workers may have the previous one memory-mapped.
+INDEX_SUFFIX = '.fa_index'
+
+
+def common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def csr(lists):
+    """
+    (offsets, values) for a list of int lists
+    """
+    offsets = np.zeros(len(lists) + 1, dtype='int64')
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    values = np.fromiter((v for values in lists for v in values), dtype='int32', count=int(offsets[-1]))
+    return offsets, values
+
+
+class FarsiIndex:
+
+    def __init__(self, words, rhyme_order, word_block_offsets, word_blocks,
+                 block_word_offsets, block_words, signature=None):
+        self.words = words
+        self.ids = {word: i for i, word in enumerate(words)}
+        self.rhyme_order = rhyme_order
+        self.word_block_offsets = word_block_offsets
+        self.word_blocks = word_blocks
+        self.block_word_offsets = block_word_offsets
+        self.block_words = block_words
+        self.signature = signature
+
+    @classmethod
+    def build(cls, corpus):
+        """
+        Build from a BlockCorpus (or any sequence of blocks of words)
+        """
+        ids = {}
+        block_lists = []
+        for i in range(len(corpus)):
+            block_ids = []
+            for word in corpus[i]:
+                word_id = ids.setdefault(word, len(ids))
+                if word_id not in block_ids:
+                    block_ids.append(word_id)
+            block_lists.append(block_ids)
+        words = list(ids)
+
+        word_lists = [[] for _ in words]
+        for block_id, block_ids in enumerate(block_lists):
+            for word_id in block_ids:
+                word_lists[word_id].append(block_id)
+
+        rhyme_order = np.array(sorted(range(len(words)), key=lambda i: words[i][::-1]), dtype='int32')
+        return cls(words, rhyme_order, *csr(word_lists), *csr(block_lists),
+                   signature=getattr(corpus, 'signature', None))
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def rhymes(self, word, top_n=10, min_suffix=2):
+        """
+        Up to top_n words sharing the longest possible ending (at least
+        min_suffix characters) with word, closest endings first
+        """
+        if not self.words:
+            return []
+        words, order = self.words, self.rhyme_order
+        target = word[::-1]
+        position = bisect_left(order, target, key=lambda i: words[i][::-1])
+
+        # Walk outwards from the insertion point; the neighbour sharing the
+        # longer reversed prefix (= ending) is taken first
+        left, right = position - 1, position
+        result = []
+        while len(result) < top_n and (left >= 0 or right < len(order)):
+            left_shared = common_prefix(target, words[order[left]][::-1]) if left >= 0 else -1
+            right_shared = common_prefix(target, words[order[right]][::-1]) if right < len(order) else -1
+            if left_shared >= right_shared:
+                candidate, shared = words[order[left]], left_shared
+                left -= 1
+            else:
+                candidate, shared = words[order[right]], right_shared
+                right += 1
+            if shared < min_suffix:
+                break
+            if candidate != word:
+                result.append(candidate)
+        return result
+
+    def neighbours(self, word, top_n=10, max_blocks=256):
+        """
+        Up to top_n (word, share) pairs: words co-occurring with word in the
+        most blocks, share being the fraction of word's blocks they appear in.
+        At most max_blocks of word's blocks are looked at.
+        """
+        word_id = self.ids.get(word)
+        if word_id is None:
+            return []
+        blocks = self.word_blocks[self.word_block_offsets[word_id]:self.word_block_offsets[word_id + 1]][:max_blocks]
+        if len(blocks) == 0:
+            return []
+        spans = [self.block_words[self.block_word_offsets[b]:self.block_word_offsets[b + 1]] for b in blocks]
+        counts = np.bincount(np.concatenate(spans), minlength=len(self.words))
+        counts[word_id] = 0
+        head = min(top_n, int(np.count_nonzero(counts)))
+        if head == 0:
+            return []
+        best = np.argpartition(-counts, head - 1)[:head]
+        best = best[np.lexsort((best, -counts[best]))]
+        return [(self.words[i], round(float(counts[i]) / len(blocks), 4)) for i in best]
+
+    def save(self, index_dir):
+        tmp_dir = temp_dir_for(index_dir)
+        try:
+            self.write(tmp_dir)
+            replace_dir(tmp_dir, index_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def write(self, index_dir):
+        encoded = [word.encode('utf-8') for word in self.words]
+        word_offsets = np.zeros(len(encoded) + 1, dtype='int64')
+        np.cumsum([len(b) for b in encoded], out=word_offsets[1:])
+        arrays = {
+            'words': np.frombuffer(b''.join(encoded), dtype='uint8'),
+            'word_offsets': word_offsets,
+            'rhyme_order': self.rhyme_order,
+            'word_block_offsets': self.word_block_offsets,
+            'word_blocks': self.word_blocks,
+            'block_word_offsets': self.block_word_offsets,
+            'block_words': self.block_words,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(index_dir, name + '.npy'), array)
+        with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.signature, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        def array(name):
+            return np.load(os.path.join(index_dir, name + '.npy'), mmap_mode='r')
+
+        with open(os.path.join(index_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            signature = json.load(f)
+        blob = bytes(array('words'))
+        offsets = array('word_offsets')
+        words = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return cls(words, np.asarray(array('rhyme_order')), array('word_block_offsets'), array('word_blocks'),
+                   array('block_word_offsets'), array('block_words'), signature)
+
+
+def load_or_build(corpus):
+    """
+    The saved index for a BlockCorpus, rebuilt and saved if the corpus changed
+    """
+    index_dir = corpus.path + INDEX_SUFFIX
+    try:
+        index = FarsiIndex.load(index_dir)
+        if index.signature == corpus.signature:
+            return index
+    except (OSError, ValueError):
+        pass
+    index = FarsiIndex.build(corpus)
+    try:
+        index.save(index_dir)
+    except OSError as e:
+        print(f"Could not save Farsi index for {corpus.path}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    # Usage: python rhyme_index_fa.py big.txt [word ...]
+    from block_corpus import BlockCorpus
+    index = load_or_build(BlockCorpus(sys.argv[1]))
+    print(f"{len(index.words)} words indexed")
+    for query in sys.argv[2:]:
+        print(query, index.rhymes(query), index.neighbours(query))
@@ -0,0 +1,203 @@
+import numpy as np
+
+from phonemes import DISTANCE, IS_VOWEL, STRESS, VOWEL_NUMBER, VOWELS, encode, vowel_distance
+
+# Ranked near / multisyllabic rhymes.
+#
+# The end of every pronunciation is laid out as SYLLABLES fixed slots of
+# [vowel, up to CODA following consonants] (consonants left-aligned, unused
+# positions padded), right-aligned so the last syllables of two words line
+# up. A candidate's score is 1 minus the weighted phoneme distance to the
+# query over the query's rhyme span (from its last stressed vowel, or a
+# chosen number of syllables), so a perfect rhyme scores 1.0, near rhymes a
+# little less, and matching more syllables counts for more.
+SYLLABLES = 3
+CODA = 3
+SLOT = 1 + CODA
+WIDTH = SYLLABLES * SLOT
+
+# Vowels weigh more than consonants, and the last syllable more than earlier ones
+SLOT_WEIGHTS = np.array([3.0] + [1.0] * CODA, dtype='float32')
+SYLLABLE_WEIGHTS = (0.6, 0.8, 1.0)
+
+# Candidates are pruned by the base vowels of their last two syllables:
+# only those whose vowels are within NEAR_VOWEL of the query's are scored
+NEAR_VOWEL = 0.45
+_VOWEL_NAMES = list(VOWELS)
+NEAR = np.zeros((len(VOWELS) + 1, len(VOWELS) + 1), dtype=bool)
+for _a in range(1, len(VOWELS) + 1):
+    for _b in range(1, len(VOWELS) + 1):
+        NEAR[_a, _b] = vowel_distance(_VOWEL_NAMES[_a - 1], _VOWEL_NAMES[_b - 1]) <= NEAR_VOWEL
+NEAR[0, 0] = True
+
+
+def rhyme_tail(ids):
+    """
+    Fixed-width slot layout (WIDTH uint8 ids) of the last SYLLABLES syllables
+    of an encoded pronunciation
+    """
+    tail = np.zeros(WIDTH, dtype='uint8')
+    vowels = np.flatnonzero(IS_VOWEL[ids])[-SYLLABLES:]
+    first_slot = SYLLABLES - len(vowels)
+    for k, position in enumerate(vowels):
+        slot = (first_slot + k) * SLOT
+        end = vowels[k + 1] if k + 1 < len(vowels) else len(ids)
+        consonants = ids[position + 1:end][:CODA]
+        tail[slot] = ids[position]
+        tail[slot + 1:slot + 1 + len(consonants)] = consonants
+    if len(vowels) == 0 and len(ids):
+        # No vowel at all (rare abbreviations): keep the final consonants
+        consonants = ids[-CODA:]
+        tail[WIDTH - SLOT + 1:WIDTH - SLOT + 1 + len(consonants)] = consonants
+    return tail
+
+
+def rhyme_span(tail):
+    """
+    Syllables from the last stressed vowel of a tail to its end (at least 1)
+    """
+    for k in range(SYLLABLES - 1, -1, -1):
+        if STRESS[tail[k * SLOT]] in (1, 2):
+            return SYLLABLES - k
+    return 1
+
+
+def tail_keys(tails):
+    """
+    Bucket key per tail: base vowel numbers of its last two syllables
+    """
+    previous = VOWEL_NUMBER[tails[:, WIDTH - 2 * SLOT]].astype('int32')
+    last = VOWEL_NUMBER[tails[:, WIDTH - SLOT]].astype('int32')
+    return previous * (len(VOWELS) + 1) + last
+
+
+class RhymeScorer:
+    """
+    Scores candidate pronunciations against a query in vectorized form.
+    words is the sorted word list (or any sequence of words), arrays the
+    tables made by compile_arrays, and ids a word -> id lookup with .get
+    (a dict is built from words if not given).
+    """
+
+    ARRAYS = ('tails', 'pron_words', 'word_rows', 'bucket_rows', 'bucket_offsets', 'slots', 'slot_ids')
+
+    def __init__(self, words, arrays, ids=None):
+        self.words = words
+        self.ids = ids if ids is not None else {word: i for i, word in enumerate(words)}
+        # tails: one WIDTH-wide row per pronunciation, grouped by word;
+        # pron_words: word id of every row; word_rows: first row of every word
+        # bucket_rows / bucket_offsets: rows of each key bucket, contiguous
+        # slots / slot_ids: distinct [vowel, coda] slots and, per row and
+        # syllable, which one it has. Distances add up slot by slot and far
+        # fewer distinct slots exist than pronunciations, so a query scores
+        # each distinct slot once and then only gathers.
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @staticmethod
+    def compile_arrays(tails, pron_words, word_count):
+        """
+        Every table the scorer needs, from the tails and their word ids
+        """
+        keys = tail_keys(tails)
+        bucket_offsets = np.zeros((len(VOWELS) + 1) ** 2 + 1, dtype='int64')
+        np.cumsum(np.bincount(keys, minlength=(len(VOWELS) + 1) ** 2), out=bucket_offsets[1:])
+        slots, slot_ids = np.unique(tails.reshape(-1, SLOT), axis=0, return_inverse=True)
+        return {
+            'tails': tails,
+            'pron_words': pron_words,
+            'word_rows': np.searchsorted(pron_words, np.arange(word_count + 1)).astype('int64'),
+            'bucket_rows': np.argsort(keys, kind='stable').astype('int32'),
+            'bucket_offsets': bucket_offsets,
+            'slots': slots,
+            'slot_ids': slot_ids.reshape(len(tails), SYLLABLES).astype('int32'),
+        }
+
+    @classmethod
+    def from_pronunciations(cls, pronunciations):
+        """
+        Build from a cmudict-style word -> [pronunciation, ...] mapping
+        """
+        words = sorted(pronunciations)
+        tails = []
+        pron_words = []
+        for word_id, word in enumerate(words):
+            for pron in pronunciations[word]:
+                tails.append(rhyme_tail(encode(pron)))
+                pron_words.append(word_id)
+        tails = np.stack(tails) if tails else np.zeros((0, WIDTH), dtype='uint8')
+        return cls(words, cls.compile_arrays(tails, np.array(pron_words, dtype='int32'), len(words)))
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def candidates(self, tail, span):
+        """
+        Rows whose last two vowels are near the query's
+        """
+        n = len(VOWELS) + 1
+        previous = VOWEL_NUMBER[tail[WIDTH - 2 * SLOT]]
+        last = VOWEL_NUMBER[tail[WIDTH - SLOT]]
+        last_ok = NEAR[last]
+        previous_ok = NEAR[previous] if span > 1 else np.ones(n, dtype=bool)
+        keys = np.flatnonzero(np.outer(previous_ok, last_ok).ravel())
+        spans = [self.bucket_rows[self.bucket_offsets[k]:self.bucket_offsets[k + 1]] for k in keys]
+        return np.concatenate(spans) if spans else np.empty(0, dtype='int32')
+
+    def find(self, word, top_n=10, syllables=None):
+        """
+        Up to top_n (word, score) pairs, best first. The rhyme span is from
+        the last stressed vowel of each pronunciation of word, or the last
+        `syllables` syllables if given (for multisyllabic rhymes). None if
+        top_n <= 0.
+        """
+        if top_n <= 0:
+            return []
+        word = word.lower()
+        word_id = self.ids.get(word)
+        if word_id is None:
+            print(f"Phonetic transcription for '{word}' not found.")
+            return []
+
+        rows_found = []
+        scores_found = []
+        for tail in self.tails[self.word_rows[word_id]:self.word_rows[word_id + 1]]:
+            span = min(SYLLABLES, syllables) if syllables else rhyme_span(tail)
+            rows = self.candidates(tail, span)
+            if len(rows) == 0:
+                continue
+            # Only the syllables of the rhyme span are compared
+            distance = np.zeros(len(rows), dtype='float32')
+            total = 0.0
+            for s in range(SYLLABLES - span, SYLLABLES):
+                query_slot = tail[s * SLOT:(s + 1) * SLOT]
+                slot_distance = DISTANCE[query_slot[None, :], self.slots] @ SLOT_WEIGHTS
+                distance += SYLLABLE_WEIGHTS[s] * slot_distance[self.slot_ids[rows, s]]
+                total += SYLLABLE_WEIGHTS[s] * SLOT_WEIGHTS.sum()
+            rows_found.append(rows)
+            scores_found.append(1.0 - distance / total)
+        if not rows_found:
+            return []
+
+        rows = np.concatenate(rows_found)
+        scores = np.concatenate(scores_found)
+        candidate_words = self.pron_words[rows]
+        keep = candidate_words != word_id
+        candidate_words, scores = candidate_words[keep], scores[keep]
+        # One integer sort key per row: rounded score first, then word id, so
+        # the partial sort below picks deterministically among equal scores
+        keys = np.round(scores * 1000).astype('int64') * len(self.words) - candidate_words
+        head = min(len(keys), top_n * 8)
+        while True:
+            if head < len(keys):
+                selected = np.argpartition(-keys, head - 1)[:head]
+            else:
+                selected = np.arange(len(keys))
+            selected = selected[np.argsort(-keys[selected], kind='stable')]
+            # Best score per word: keep the first row of every word
+            _, first = np.unique(candidate_words[selected], return_index=True)
+            best = selected[np.sort(first)][:top_n]
+            if len(best) == top_n or head == len(keys):
+                break
+            head = min(len(keys), head * 4)
+        return [(self.words[candidate_words[i]], round(float(scores[i]), 3)) for i in best]
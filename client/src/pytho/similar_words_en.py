@@ -1,48 +1,37 @@
-import numpy as np
+import os
+import sys
+
+from embedding_store import EmbeddingStore, build_store, store_exists
+from similarity import SimilarityEngine
 
 # Path to your GloVe file (download from https://nlp.stanford.edu/projects/glove/)
-# Example: 'glove.6B.300d.txt'
-glove_path = 'D:\\modern-portfolio-main\\public\\glove.6B.300d.txt'
-
-# Load embeddings into a dictionary
-embeddings = {}
-with open(glove_path, 'r', encoding='utf-8') as f:
-    for line in f:
-        values = line.strip().split()
-        word = values[0]
-        vector = np.array(values[1:], dtype='float32')
-        embeddings[word] = vector
+# Example: 'glove.6B.300d.txt' - any GloVe-format file works, including 840B
+glove_path = sys.argv[1] if len(sys.argv) > 1 else 'D:\\modern-portfolio-main\\public\\glove.6B.300d.txt'
+# Binary store converted from it on the first run (see embedding_store.py)
+store_dir = os.path.splitext(glove_path)[0] + '_store'
+
+similarity = None
 
 # Function to find most similar words
 def find_similar_words(word, top_n=10):
-    if word not in embeddings:
-        print(f"Word '{word}' not found in embeddings.")
-        return []
-
-    # Get the embedding for the input word
-    word_vec = embeddings[word]
-
-    # Compute cosine similarity with all other words
-    similarities = {}
-    for other_word, other_vec in embeddings.items():
-        if other_word == word:
-            continue
-        # Cosine similarity: dot product divided by norms
-        sim = np.dot(word_vec, other_vec) / (np.linalg.norm(word_vec) * np.linalg.norm(other_vec))
-        similarities[other_word] = sim
+    return similarity.top_k(word, top_n)
 
-    # Sort by similarity score, descending
-    most_similar = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
 
-    # Return top N
-    return most_similar[:top_n]
+if __name__ == "__main__":
+    # The conversion runs a process pool, whose workers re-import this
+    # file on Windows, so everything runs under this guard
+    if not store_exists(store_dir):
+        build_store(glove_path, store_dir)
+    embeddings = EmbeddingStore(store_dir)
+    # Pre-normalized matrix over the whole vocabulary; only the word itself is excluded
+    similarity = SimilarityEngine.from_embeddings(embeddings, exclude_substrings=False)
 
-# Example usage
-input_word = input("Enter an English word: ").strip()
-top_n = int(input("How many similar words do you want? "))
+    # Example usage
+    input_word = input("Enter an English word: ").strip()
+    top_n = int(input("How many similar words do you want? "))
 
-similar_words = find_similar_words(input_word, top_n)
+    similar_words = find_similar_words(input_word, top_n)
 
-print(f"\nTop {top_n} words similar to '{input_word}':")
-for word, score in similar_words:
-    print(f"{word} (similarity: {score:.4f})")
\ No newline at end of file
+    print(f"\nTop {top_n} words similar to '{input_word}':")
+    for word, score in similar_words:
+        print(f"{word} (similarity: {score:.4f})")
\ No newline at end of file
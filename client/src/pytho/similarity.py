@@ -0,0 +1,267 @@
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """
+    Return a float32 copy of matrix with every row scaled to unit length
+    (all-zero rows are left as zeros)
+    """
+    matrix = np.asarray(matrix, dtype='float32')
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype='float32')
+
+
+class SimilarityEngine:
+    """
+    Cosine-similarity search over a pre-normalized matrix.
+    One matrix-vector product scores the whole vocabulary and a partial sort
+    picks the head, instead of a Python loop and a full sort per query.
+    """
+
+    def __init__(self, words, unit_vectors, exclude_substrings=True):
+        self.words = list(words)
+        self.index = {word: row for row, word in enumerate(self.words)}
+        # Rows must already be unit length (see normalize_rows)
+        self.unit = unit_vectors
+        # wordgen.py also drops words that contain, or are contained in, the
+        # query word; similar_words_en.py only drops the word itself
+        self.exclude_substrings = exclude_substrings
+        # Optional approximate index (ann_index.IVFIndex); None means exact search
+        self.ann = None
+        # Optional compressed copy of unit for shortlisting (see use_compressed)
+        self.compressed = None
+        self.scales = None
+        self.rescore = 100
+        # Projection to the compressed copy's space, for a reduced-dimension
+        # tier (see use_reduced); None when it has the full dimension
+        self.projection = None
+
+    @classmethod
+    def from_embeddings(cls, embeddings, exclude_substrings=True):
+        """
+        Build an engine from an EmbeddingStore or a plain word -> vector dict
+        """
+        if hasattr(embeddings, 'unit_vectors'):
+            return cls(embeddings.words, embeddings.unit_vectors(), exclude_substrings)
+        words = list(embeddings.keys())
+        matrix = np.stack([embeddings[word] for word in words])
+        return cls(words, normalize_rows(matrix), exclude_substrings)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def is_excluded(self, word, other_word):
+        if other_word == word:
+            return True
+        return self.exclude_substrings and (other_word in word or word in other_word)
+
+    def is_excluded_any(self, words, other_word):
+        return any(self.is_excluded(word, other_word) for word in words)
+
+    def use_compressed(self, vectors, scales=None, rescore=100):
+        """
+        Shortlist candidates from a compressed copy of the unit matrix
+        (float16, or int8 with one float32 scale per row) and re-score the
+        best rescore rows against the full-precision matrix. Only the
+        compressed copy is streamed per query; the float32 pages touched are
+        those of the shortlist.
+        """
+        self.compressed = vectors
+        self.scales = scales
+        self.rescore = rescore
+        self.projection = None
+
+    def use_reduced(self, vectors, projection, rescore=100):
+        """
+        Search a reduced-dimension copy of the unit matrix (rows of
+        unit @ projection, renormalized; see reduced_tier.py). Queries are
+        projected the same way. The best rescore rows are re-ranked at full
+        dimension; with rescore=0 the reduced scores are returned as they are.
+        """
+        self.use_compressed(vectors, None, rescore)
+        self.projection = projection
+
+    def score(self, queries, block_size=16384):
+        """
+        Similarity of every vocabulary row to each unit-length query, shape
+        (len(queries), vocabulary). Approximate when a compressed copy is in use.
+        """
+        if self.compressed is None:
+            return queries @ self.unit.T
+        if self.projection is not None:
+            queries = normalize_rows(queries @ self.projection)
+        n = len(self.words)
+        scores = np.empty((len(queries), n), dtype='float32')
+        # Decompress block by block so the float32 temporaries stay small
+        for start in range(0, n, block_size):
+            block = np.asarray(self.compressed[start:start + block_size], dtype='float32')
+            part = queries @ block.T
+            if self.scales is not None:
+                part *= self.scales[start:start + block_size]
+            scores[:, start:start + block_size] = part
+        return scores
+
+    def head_size(self, top_n):
+        head = top_n * 4 + 16
+        if self.compressed is not None:
+            head = max(head, self.rescore)
+        return min(len(self.words), head)
+
+    def rank(self, candidates, scores, query):
+        """
+        Order candidate rows best first; returns (rows, scores). With a
+        compressed copy in use the candidates are re-scored at full precision.
+        """
+        if self.compressed is not None and self.rescore:
+            candidate_scores = self.unit[candidates] @ query
+        else:
+            candidate_scores = scores[candidates]
+        order = np.argsort(-candidate_scores, kind='stable')
+        return candidates[order], candidate_scores[order]
+
+    def top_k(self, word, top_n=10):
+        """
+        The top_n (word, similarity) pairs for word, most similar first
+        """
+        if word not in self.index:
+            print(f"Word '{word}' not found in embeddings.")
+            return []
+        query = self.unit[self.index[word]]
+        if self.ann is not None:
+            rows, row_scores = self.ann.search(query, self.unit, top_n * 4 + 16)
+            result = self.take(rows, row_scores, (word,), top_n)
+            if len(result) == top_n:
+                return result
+        scores = self.score(query[None])[0]
+        return self.select(scores, (word,), top_n, query)
+
+    def top_k_batch(self, words, top_n=10, block_size=256):
+        """
+        top_k for many words at once: each block of queries is scored with a
+        single matrix-matrix product and every row is partial-sorted together.
+        Returns one result list per input word, in order ([] if unknown).
+        """
+        results = [[] for _ in words]
+        known = [i for i, word in enumerate(words) if word in self.index]
+        if not known:
+            return results
+        queries = np.asarray(self.unit[[self.index[words[i]] for i in known]])
+        found = self.search(queries, [(words[i],) for i in known], top_n, block_size)
+        for position, result in zip(known, found):
+            results[position] = result
+        return results
+
+    def composite_query(self, positive, negative=()):
+        """
+        Unit-length sum of the positive words' unit vectors minus the
+        negative ones' (unknown words are ignored), or None if no positive
+        word is known. [a, b, c] is a centroid of seeds; positive [a, c] with
+        negative [b] is the analogy a - b + c.
+        """
+        rows = [self.index[word] for word in positive if word in self.index]
+        if not rows:
+            return None
+        query = np.asarray(self.unit[rows], dtype='float32').sum(axis=0)
+        negative_rows = [self.index[word] for word in negative if word in self.index]
+        if negative_rows:
+            query -= np.asarray(self.unit[negative_rows], dtype='float32').sum(axis=0)
+        return normalize_rows(query[None])[0]
+
+    def top_k_composite(self, queries, top_n=10, block_size=256):
+        """
+        top_k for composite queries, given as (positive words, negative words)
+        pairs (see composite_query). All queries are scored together, and the
+        usual exclusion rules apply to every input word of a query.
+        Returns one result list per query, in order.
+        """
+        results = [[] for _ in queries]
+        vectors = [self.composite_query(positive, negative) for positive, negative in queries]
+        known = [i for i, vector in enumerate(vectors) if vector is not None]
+        if not known:
+            return results
+        inputs = [tuple(queries[i][0]) + tuple(queries[i][1]) for i in known]
+        found = self.search(np.stack([vectors[i] for i in known]), inputs, top_n, block_size)
+        for position, result in zip(known, found):
+            results[position] = result
+        return results
+
+    def search(self, queries, inputs, top_n=10, block_size=256):
+        """
+        Top-k for a matrix of unit-length query vectors, excluding for each
+        query the words related to its input words (one tuple per query).
+        With an ANN index each query is first looked up there, like top_k;
+        only the queries it cannot fill are scored exactly, in blocks.
+        """
+        results = [[] for _ in inputs]
+        n = len(self.words)
+        if n == 0 or top_n <= 0:
+            return results
+        head = self.head_size(top_n)
+
+        pending = np.arange(len(queries))
+        if self.ann is not None:
+            missed = []
+            for i in pending:
+                rows, row_scores = self.ann.search(queries[i], self.unit, top_n * 4 + 16)
+                result = self.take(rows, row_scores, inputs[i], top_n)
+                if len(result) == top_n:
+                    results[i] = result
+                else:
+                    missed.append(i)
+            pending = np.asarray(missed, dtype=int)
+
+        for start in range(0, len(pending), block_size):
+            positions = pending[start:start + block_size]
+            block = queries[positions]
+            scores = self.score(block)
+            if head < n:
+                heads = np.argpartition(-scores, head - 1, axis=1)[:, :head]
+            else:
+                heads = np.broadcast_to(np.arange(n), scores.shape)
+            for i, position in enumerate(positions):
+                words = inputs[position]
+                rows, row_scores = self.rank(heads[i], scores[i], block[i])
+                result = self.take(rows, row_scores, words, top_n)
+                if len(result) < top_n and head < n:
+                    # Exclusions ate the shared head; redo this row on its own
+                    result = self.select(scores[i], words, top_n, block[i])
+                results[position] = result
+        return results
+
+    def take(self, candidates, candidate_scores, words, top_n):
+        """
+        Walk candidates (best first) and keep up to top_n not excluded for
+        any of words
+        """
+        result = []
+        for row, score in zip(candidates, candidate_scores):
+            other_word = self.words[row]
+            if self.is_excluded_any(words, other_word):
+                continue
+            result.append((other_word, float(score)))
+            if len(result) == top_n:
+                break
+        return result
+
+    def select(self, scores, words, top_n, query):
+        """
+        Partial-sort scores and return the best top_n rows not excluded for
+        any of words
+        """
+        n = len(scores)
+        if n == 0 or top_n <= 0:
+            return []
+        # Excluded words are rare, so a small head almost always suffices;
+        # it is only widened when the exclusions eat into it
+        head = self.head_size(top_n)
+        while True:
+            if head < n:
+                candidates = np.argpartition(-scores, head - 1)[:head]
+            else:
+                candidates = np.arange(n)
+            rows, row_scores = self.rank(candidates, scores, query)
+            result = self.take(rows, row_scores, words, top_n)
+            if len(result) == top_n or head == n:
+                return result
+            head = min(n, head * 4)
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from ann_index import ANN_DIR, IVFIndex, ann_exists, ann_matches
+from embedding_store import EmbeddingStore, build_store, store_key
+from similarity import SimilarityEngine
+
+# The IVF index behind SimilarityEngine: probing every list gives the exact
+# answers, batched search goes through it like top_k, and a saved index is
+# only used with the store it was built from.
+# Run with: python -m pytest -q
+
+WORDS = [f'w{i:04d}' for i in range(1500)]
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('ann')
+    rng = np.random.default_rng(0)
+    glove_path = tmp / 'glove.txt'
+    with open(glove_path, 'w', encoding='utf-8') as f:
+        for word in WORDS:
+            f.write(word + ' ' + ' '.join(f'{x:.6f}' for x in rng.standard_normal(16)) + '\n')
+    build_store(str(glove_path), str(tmp / 'store'), workers=1)
+    return EmbeddingStore(str(tmp / 'store'))
+
+
+def words_of(results):
+    return [[w for w, _ in result] for result in results]
+
+
+@pytest.mark.parametrize('pq_subspaces', [0, 4])
+def test_all_lists_probed_is_exact(store, pq_subspaces):
+    exact = SimilarityEngine.from_embeddings(store)
+    approx = SimilarityEngine.from_embeddings(store)
+    approx.ann = IVFIndex.build(approx.unit, nlist=16, pq_subspaces=pq_subspaces)
+    approx.ann.nprobe = approx.ann.nlist
+    approx.ann.rerank = len(WORDS)
+    sample = WORDS[::50]
+    assert words_of(approx.top_k(word, 5) for word in sample) == words_of(exact.top_k(word, 5) for word in sample)
+    assert words_of(approx.top_k_batch(sample, 5)) == words_of(exact.top_k_batch(sample, 5))
+
+
+def test_batched_search_uses_index(store):
+    engine = SimilarityEngine.from_embeddings(store)
+    engine.ann = IVFIndex.build(engine.unit, nlist=16)
+    engine.ann.nprobe = 1
+    calls = []
+    search = engine.ann.search
+
+    def counted(*args):
+        calls.append(1)
+        return search(*args)
+
+    engine.ann.search = counted
+    sample = WORDS[:40]
+    batch = engine.top_k_batch(sample, 5)
+    assert len(calls) == len(sample)
+    assert words_of(batch) == words_of(engine.top_k(word, 5) for word in sample)
+    assert all(len(result) == 5 for result in batch)
+
+
+def test_saved_index_tied_to_store(store):
+    store_dir = store.store_dir
+    index = IVFIndex.build(store.unit_vectors(), nlist=8)
+    assert not ann_exists(store_dir)
+    index.save(os.path.join(store_dir, ANN_DIR), store_key(store_dir))
+    assert ann_matches(store_dir)
+    loaded = IVFIndex.load(os.path.join(store_dir, ANN_DIR))
+    assert np.array_equal(loaded.rows, index.rows) and loaded.nlist == 8
+    # Saved without a store key (or from another store): not used
+    index.save(os.path.join(store_dir, ANN_DIR))
+    assert ann_exists(store_dir) and not ann_matches(store_dir)
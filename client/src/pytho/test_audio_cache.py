@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import numpy as np
+import soundfile as sf
+
+from audio_cache import AudioCache, params_key
+
+# The audio cache: decoded PCM and features come back from disk keyed by
+# file content, and entries beyond the size limit are evicted oldest first.
+# Run with: python -m pytest -q
+
+SR = 22050
+
+
+def write_wav(path, freq, seconds=0.5):
+    t = np.arange(int(seconds * SR)) / SR
+    sf.write(str(path), (0.5 * np.sin(2 * np.pi * freq * t)).astype('float32'), SR)
+    return str(path)
+
+
+def test_pcm_hit_by_content(tmp_path):
+    cache = AudioCache(str(tmp_path / 'cache'))
+    track = write_wav(tmp_path / 'a.wav', 440.0)
+    y, sr = cache.load_pcm(track, SR)
+    again, _ = cache.load_pcm(track, SR)
+    assert isinstance(again, np.memmap) and np.array_equal(again, y)
+    # A copy under another name is the same entry
+    copy = str(tmp_path / 'copy.wav')
+    shutil.copy(track, copy)
+    cache.load_pcm(copy, SR)
+    assert (cache.counts['pcm_hits'], cache.counts['pcm_misses']) == (2, 1)
+    assert cache.file_hash(copy) == cache.file_hash(track)
+    # Another rate is another file of the same entry
+    cache.load_pcm(track, SR // 2)
+    assert cache.counts['pcm_misses'] == 2 and cache.stats()['entries'] == 1
+
+
+def test_features_round_trip(tmp_path):
+    cache = AudioCache(str(tmp_path / 'cache'))
+    digest = cache.file_hash(write_wav(tmp_path / 'a.wav', 220.0))
+    params = params_key(SR, 512, 2048, 65.4, 2093.0)
+    assert cache.load_features(digest, 'beats', params) is None
+    cache.save_features(digest, 'beats', params, {'tempo': np.array([120.0]), 'frames': np.arange(5, dtype='int32')})
+    arrays = cache.load_features(digest, 'beats', params)
+    assert arrays['tempo'][0] == 120.0 and arrays['frames'].tolist() == [0, 1, 2, 3, 4]
+    assert cache.load_features(digest, 'beats', params_key(SR, 256, 2048, 65.4, 2093.0)) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    tracks = [write_wav(tmp_path / f'{i}.wav', 200.0 + 50 * i) for i in range(3)]
+    cache = AudioCache(str(tmp_path / 'cache'))
+    for track in tracks:
+        cache.load_pcm(track, SR)
+    entry_bytes = max(size for _, size, _ in cache.entries())
+    # Room for two entries: the oldest one goes when a third is written
+    cache = AudioCache(str(tmp_path / 'small'), max_bytes=int(entry_bytes * 2.5))
+    for i, track in enumerate(tracks):
+        cache.load_pcm(track, SR)
+        os.utime(cache.entry_dir(cache.file_hash(track)), (i, i))
+    cache.evict()
+    kept = {path for _, _, path in cache.entries()}
+    assert len(kept) == 2 and cache.entry_dir(cache.file_hash(tracks[0])) not in kept
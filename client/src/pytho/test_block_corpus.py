@@ -0,0 +1,40 @@
+from block_corpus import BlockCorpus
+
+# BlockCorpus against the line loop it replaced (read_blocks_from_file, formerly in wordgen.py)
+
+
+def baseline_blocks(filepath, encoding="utf-8"):
+    blocks = []
+    current_block = []
+    with open(filepath, "r", encoding=encoding) as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if line == "":
+                if current_block:
+                    blocks.append(current_block)
+                    current_block = []
+            else:
+                current_block.append(line)
+        if current_block:
+            blocks.append(current_block)
+    return blocks
+
+
+def test_blocks_match_baseline(tmp_path):
+    path = tmp_path / "corpus.txt"
+    # Control characters that str.splitlines() would treat as line breaks
+    text = "\n\nسلام دنیا\nخانه\n\n\n  a b  \nd\x0ce\nf\x1cg\x85h i\n   \n\nlast\n"
+    path.write_bytes(text.encode("utf-8"))
+    corpus = BlockCorpus(str(path))
+    assert [corpus[i] for i in range(len(corpus))] == baseline_blocks(str(path))
+    assert len(corpus) == 3
+
+
+def test_offsets_rebuilt_when_file_changes(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text("a\nb\n\nc\n", encoding="utf-8")
+    corpus = BlockCorpus(str(path))
+    assert len(corpus) == 2 and not corpus.is_stale()
+    path.write_text("a\n\nb\n\nc\n\nd\n", encoding="utf-8")
+    assert corpus.is_stale()
+    assert [BlockCorpus(str(path))[i] for i in range(4)] == [["a"], ["b"], ["c"], ["d"]]
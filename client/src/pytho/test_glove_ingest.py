@@ -0,0 +1,58 @@
+import numpy as np
+
+from glove_ingest import ingest
+
+# Parallel GloVe ingestion against a plain line-by-line parse: the same rows
+# in the same order whatever the chunking, malformed lines skipped, and a
+# vector with a field that is not a number kept as zeros.
+# Run with: python -m pytest -q
+
+DIM = 6
+
+
+def write_glove(path, rows, extra_lines=()):
+    with open(path, 'w', encoding='utf-8') as f:
+        for word, vector in rows:
+            f.write(word + ' ' + ' '.join(f'{x:.6f}' for x in vector) + '\n')
+        for line in extra_lines:
+            f.write(line + '\n')
+
+
+def read_matrix(path, rows):
+    return np.fromfile(path, dtype='float32').reshape(rows, DIM)
+
+
+def test_matches_line_by_line_parse(tmp_path):
+    rng = np.random.default_rng(0)
+    # Words with spaces and non-ASCII, as in the 840B file
+    rows = [(f'word{i}' if i % 7 else f'. . {i}' if i % 2 else f'سلام{i}', rng.standard_normal(DIM))
+            for i in range(400)]
+    glove_path = str(tmp_path / 'glove.txt')
+    write_glove(glove_path, rows, extra_lines=['short 1.0 2.0', ''])
+    # Small chunks: many ranges, each cut at a line boundary
+    words, dim = ingest(glove_path, str(tmp_path / 'v.f32'), str(tmp_path / 'u.f32'), workers=2, chunk_bytes=2048)
+    assert dim == DIM
+    assert words == [word for word, _ in rows]
+    vectors = read_matrix(tmp_path / 'v.f32', len(rows))
+    expected = np.array([np.float32(f'{x:.6f}') for _, vector in rows for x in vector]).reshape(len(rows), DIM)
+    assert np.array_equal(vectors, expected)
+    unit = read_matrix(tmp_path / 'u.f32', len(rows))
+    assert np.allclose(np.linalg.norm(unit, axis=1), 1.0, atol=1e-6)
+
+
+def test_vocab_filter_and_unreadable_field(tmp_path):
+    rows = [('Keep', np.ones(DIM)), ('drop', np.ones(DIM)), ('bad', np.ones(DIM)), ('also', np.full(DIM, 2.0))]
+    glove_path = str(tmp_path / 'glove.txt')
+    write_glove(glove_path, rows)
+    with open(glove_path, 'r', encoding='utf-8') as f:
+        text = f.read().replace('bad 1.000000', 'bad x1.0')
+    with open(glove_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    words, _ = ingest(glove_path, str(tmp_path / 'v.f32'), str(tmp_path / 'u.f32'),
+                      vocab={'keep', 'bad', 'also'}, workers=1)
+    assert words == ['Keep', 'bad', 'also']
+    vectors = read_matrix(tmp_path / 'v.f32', 3)
+    assert np.array_equal(vectors[1], np.zeros(DIM))
+    assert np.array_equal(vectors[[0, 2]], [np.ones(DIM), np.full(DIM, 2.0)])
+    # A zero row stays zero rather than dividing by zero
+    assert np.array_equal(read_matrix(tmp_path / 'u.f32', 3)[1], np.zeros(DIM))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from pitch_fast import decimation, fast_pitch, yin_batch
+
+# The fast pitch tracker on signals whose pitch is known: steady sines
+# across the range are found to within a few cents, and silence is
+# unvoiced. Run with: python -m pytest -q
+
+SR = 22050
+FMIN, FMAX = 65.4, 2093.0  # C2 to C7, as audio_analysis uses
+
+
+def sine(freq, seconds=1.0, sr=SR, amplitude=0.5):
+    t = np.arange(int(seconds * sr)) / sr
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype('float32')
+
+
+def cents(f0, freq):
+    return np.abs(1200 * np.log2(f0 / freq))
+
+
+@pytest.mark.parametrize('freq', [82.41, 220.0, 440.0, 1046.5, 1975.5])
+def test_sine_pitch(freq):
+    f0, voiced = fast_pitch(sine(freq), SR, FMIN, FMAX)
+    assert len(f0) == len(voiced) == 1 + SR // 512
+    # Away from the edges, where frames reach past the signal
+    middle = slice(4, -4)
+    assert voiced[middle].all()
+    assert np.median(cents(f0[middle], freq)) < 5
+    assert cents(f0[middle], freq).max() < 20
+
+
+def test_silence_is_unvoiced():
+    y = np.concatenate([np.zeros(SR // 2, dtype='float32'), sine(330.0, 0.5), np.zeros(SR // 2, dtype='float32')])
+    f0, voiced = fast_pitch(y, SR, FMIN, FMAX)
+    frames = np.arange(len(f0)) * 512 / SR
+    quiet = (frames < 0.4) | (frames > 1.1)
+    assert not voiced[quiet].any() and np.isnan(f0[quiet]).all()
+    loud = (frames > 0.6) & (frames < 0.9)
+    assert voiced[loud].all() and np.median(cents(f0[loud], 330.0)) < 5
+
+
+def test_yin_batch_period():
+    # Periods of 50 and 80.5 samples; the half-sample one needs the
+    # parabolic refinement
+    t = np.arange(1024)
+    frames = np.stack([np.sin(2 * np.pi * t / 50), np.sin(2 * np.pi * t / 80.5)])
+    period, voiced = yin_batch(frames, 20, 200)
+    assert voiced.all()
+    assert np.allclose(period, [50, 80.5], atol=0.2)
+
+
+def test_decimation_keeps_fmax_and_hop():
+    assert decimation(SR, 2093.0, 512) == 2
+    assert decimation(SR, 523.3, 512) == 8
+    # The hop must stay a whole number of decimated samples: 500 / 8 is not
+    assert decimation(SR, 523.3, 500) == 4
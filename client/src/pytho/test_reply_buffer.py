@@ -0,0 +1,80 @@
+import threading
+import time
+
+from reply_buffer import ReplyBuffer
+
+# The reply buffer's producer: it fills up to depth, refills what is
+# popped, keeps going after a failed batch, and misses are counted.
+# Run with: python -m pytest -q
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class Producer:
+    def __init__(self, fail_first=0):
+        self.lock = threading.Lock()
+        self.next = 0
+        self.batches = []
+        self.fail_first = fail_first
+
+    def __call__(self, n):
+        with self.lock:
+            self.batches.append(n)
+            if self.fail_first:
+                self.fail_first -= 1
+                raise RuntimeError('store not ready')
+            replies = list(range(self.next, self.next + n))
+            self.next += n
+            return replies
+
+
+def test_fills_to_depth_in_batches():
+    produce = Producer()
+    buffer = ReplyBuffer(produce, depth=10, refill_batch=4, refill_interval=0)
+    buffer.start()
+    try:
+        wait_for(lambda: buffer.stats()['buffered'] == 10)
+        assert produce.batches[:3] == [4, 4, 2]
+        assert buffer.stats()['produced'] == 10
+    finally:
+        buffer.stop()
+
+
+def test_refills_what_is_popped_in_order():
+    produce = Producer()
+    buffer = ReplyBuffer(produce, depth=8, refill_batch=8, refill_interval=0)
+    buffer.start()
+    try:
+        wait_for(lambda: buffer.stats()['buffered'] == 8)
+        assert [buffer.pop() for _ in range(5)] == [0, 1, 2, 3, 4]
+        wait_for(lambda: buffer.stats()['buffered'] == 8)
+        assert buffer.stats()['produced'] == 13
+        assert [buffer.pop() for _ in range(8)] == list(range(5, 13))
+        assert buffer.stats()['hits'] == 13
+    finally:
+        buffer.stop()
+
+
+def test_survives_failed_batches_and_counts_misses():
+    produce = Producer(fail_first=2)
+    buffer = ReplyBuffer(produce, depth=4, refill_batch=4, refill_interval=0.001)
+    assert buffer.pop() is None
+    buffer.start()
+    try:
+        wait_for(lambda: buffer.stats()['buffered'] == 4)
+        stats = buffer.stats()
+        assert stats['errors'] == 2 and stats['misses'] == 1
+        assert buffer.pop() == 0
+    finally:
+        buffer.stop()
+
+
+def test_depth_zero_never_starts():
+    buffer = ReplyBuffer(Producer(), depth=0)
+    buffer.start()
+    assert buffer.thread is None and buffer.pop() is None
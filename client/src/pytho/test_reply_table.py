@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from build_resources import bundle_paths, ensure_pron_store
+from embedding_store import EmbeddingStore, build_store
+from pron_store import PronunciationStore
+from reply_table import ReplyTable, build_table, stores_key, table_path
+from rhyme_index import save_pronunciations
+
+# The reply table against the stores it was built from: its rows are what
+# the live path answers, and it stops matching once a store is rebuilt.
+# Run with: python -m pytest -q
+
+PRONUNCIATIONS = {
+    'cat': [['K', 'AE1', 'T']],
+    'hat': [['HH', 'AE1', 'T']],
+    'bat': [['B', 'AE1', 'T']],
+    'love': [['L', 'AH1', 'V']],
+    'glove': [['G', 'L', 'AH1', 'V']],
+    'stone': [['S', 'T', 'OW1', 'N']],
+    'phone': [['F', 'OW1', 'N']],
+}
+WORDS = list(PRONUNCIATIONS)
+
+
+def write_bundle(resources_dir, words, seed=0):
+    rng = np.random.default_rng(seed)
+    store_dir, cmudict_path = bundle_paths(str(resources_dir))
+    os.makedirs(str(resources_dir), exist_ok=True)
+    glove_path = os.path.join(str(resources_dir), 'glove.txt')
+    with open(glove_path, 'w', encoding='utf-8') as f:
+        for word in words:
+            f.write(word + ' ' + ' '.join(f'{x:.6f}' for x in rng.standard_normal(8)) + '\n')
+    build_store(glove_path, store_dir, workers=1)
+    save_pronunciations(PRONUNCIATIONS, cmudict_path)
+    return store_dir
+
+
+def open_stores(resources_dir):
+    store_dir, _ = bundle_paths(str(resources_dir))
+    return EmbeddingStore(store_dir), PronunciationStore(ensure_pron_store(str(resources_dir)))
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    resources_dir = tmp_path / 'resources'
+    write_bundle(resources_dir, WORDS)
+    build_table(str(resources_dir), top_n=3, workers=1)
+    return resources_dir
+
+
+def test_table_matches_its_stores(bundle):
+    store, pronunciations = open_stores(bundle)
+    assert ReplyTable.matches(table_path(str(bundle)), store, pronunciations)
+    table = ReplyTable(table_path(str(bundle)), store.words, store.index, pronunciations.word_table)
+    assert {name: table.meta[name] for name in stores_key(store, pronunciations)} == stores_key(store, pronunciations)
+    row = table.row('cat', 3)
+    assert sorted(table.rhymes(row, 3)) == ['bat', 'hat']
+    assert len(table.similar(row, 3)) == 3
+    # More than was precomputed goes to the live path
+    assert table.row('cat', 4) is None
+
+
+def test_rebuilt_store_invalidates_table(bundle):
+    # Same words and size, other order: only the word-list hash tells
+    write_bundle(bundle, WORDS[::-1], seed=1)
+    store, pronunciations = open_stores(bundle)
+    assert len(store) == len(WORDS)
+    assert not ReplyTable.matches(table_path(str(bundle)), store, pronunciations)
+    build_table(str(bundle), top_n=3, workers=1)
+    assert ReplyTable.matches(table_path(str(bundle)), store, pronunciations)
+    # The rebuild was swapped in whole; nothing is left beside it
+    assert sorted(name for name in os.listdir(str(bundle)) if name.startswith('reply_table')) == ['reply_table']
+
+
+def test_missing_or_partial_table_does_not_match(tmp_path):
+    resources_dir = tmp_path / 'resources'
+    write_bundle(resources_dir, WORDS)
+    store, pronunciations = open_stores(resources_dir)
+    assert not ReplyTable.matches(table_path(str(resources_dir)), store, pronunciations)
+    os.makedirs(table_path(str(resources_dir)))
+    with open(os.path.join(table_path(str(resources_dir)), 'meta.json'), 'w', encoding='utf-8') as f:
+        f.write('{"words": 7')
+    assert not ReplyTable.matches(table_path(str(resources_dir)), store, pronunciations)
@@ -0,0 +1,58 @@
+import os
+
+from block_corpus import BlockCorpus
+from rhyme_index_fa import INDEX_SUFFIX, FarsiIndex, load_or_build
+
+# The Farsi index: a saved index answers like the one it was built from,
+# and a changed corpus is re-indexed without breaking an index still in use.
+# Run with: python -m pytest -q
+
+CORPUS = "سلام\nکلام\nپیام\n\nدنیا\nسلام\nرویا\n\nکلام\nدنیا\nتماشا\n\nپیام\nسلام\n"
+NEW_CORPUS = "باران\nیاران\n\nیاران\nکاران\nسلام\n"
+
+
+def write(path, text):
+    # Replaced by a rename, as wordgen.py expects of a live corpus
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def answers(index):
+    return {word: (index.rhymes(word), index.neighbours(word)) for word in index.words}
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "corpus.txt"
+    write(path, CORPUS)
+    built = FarsiIndex.build(BlockCorpus(str(path)))
+    built.save(str(tmp_path / "index"))
+    loaded = FarsiIndex.load(str(tmp_path / "index"))
+    assert loaded.words == built.words
+    assert loaded.signature == built.signature
+    assert answers(loaded) == answers(built)
+    assert loaded.rhymes("سلام", 2) == ["کلام", "پیام"]
+    # پیام shares two of the three blocks سلام is in
+    assert loaded.neighbours("سلام", 1) == [("پیام", 0.6667)]
+    assert loaded.rhymes("missing") == [] and loaded.neighbours("missing") == []
+
+
+def test_load_or_build_reuses_then_rebuilds(tmp_path):
+    path = tmp_path / "corpus.txt"
+    write(path, CORPUS)
+    first = load_or_build(BlockCorpus(str(path)))
+    assert os.path.exists(str(path) + INDEX_SUFFIX)
+    again = load_or_build(BlockCorpus(str(path)))
+    assert again.words == first.words and answers(again) == answers(first)
+
+    old = FarsiIndex.load(str(path) + INDEX_SUFFIX)
+    old_answers = answers(old)
+    write(path, NEW_CORPUS)
+    rebuilt = load_or_build(BlockCorpus(str(path)))
+    assert "باران" in rebuilt and "دنیا" not in rebuilt
+    assert sorted(rebuilt.rhymes("باران")) == sorted(["یاران", "کاران"])
+    # The index mapped before the rebuild still reads its own files
+    assert answers(old) == old_answers
+    assert sorted(os.listdir(tmp_path)) == sorted(["corpus.txt", "corpus.txt.blocks.json", "corpus.txt.blocks.npy",
+                                                   "corpus.txt" + INDEX_SUFFIX])
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore, build_store
+from pron_store import CompiledRhymeIndex, PronunciationStore, compile_pronunciations
+from rhyme_index import RhymeIndex, get_rhyme_part
+from similarity import SimilarityEngine
+
+# The fast paths against the loops they replaced in wordgen.py: top-k
+# similarity with its substring exclusion rule, and the rhyme buckets
+# (dict-based and compiled). Run with: python -m pytest -q
+
+# Words that contain each other, so the exclusion rule has work to do
+WORDS = ['cat', 'cats', 'concat', 'at', 'dog', 'dogs', 'hotdog', 'bird', 'word', 'sword', 'words',
+         'love', 'glove', 'above', 'dove', 'of', 'stone', 'tone', 'one', 'bone', 'phone', 'none']
+
+CMUDICT = {
+    'cat': [['K', 'AE1', 'T']],
+    'hat': [['HH', 'AE1', 'T']],
+    'at': [['AE1', 'T'], ['AH0', 'T']],
+    'that': [['DH', 'AE1', 'T'], ['DH', 'AH0', 'T']],
+    'combat': [['K', 'AA1', 'M', 'B', 'AE2', 'T'], ['K', 'AH0', 'M', 'B', 'AE1', 'T']],
+    'love': [['L', 'AH1', 'V']],
+    'glove': [['G', 'L', 'AH1', 'V']],
+    'above': [['AH0', 'B', 'AH1', 'V']],
+    'of': [['AH1', 'V'], ['AH0', 'V']],
+    'stone': [['S', 'T', 'OW1', 'N']],
+    'phone': [['F', 'OW1', 'N']],
+    'the': [['DH', 'AH0'], ['DH', 'AH1'], ['DH', 'IY0']],
+    'a': [['AH0'], ['EY1']],
+}
+
+
+def baseline_similar(embeddings, word, top_n=10):
+    # find_similar_words as it was: cosine against every other word
+    word_vec = embeddings[word]
+    similarities = {}
+    for other_word, other_vec in embeddings.items():
+        if other_word == word or other_word in word or word in other_word:
+            continue
+        sim = np.dot(word_vec, other_vec) / (np.linalg.norm(word_vec) * np.linalg.norm(other_vec))
+        similarities[other_word] = float(sim)
+    return sorted(similarities.items(), key=lambda item: item[1], reverse=True)[:top_n]
+
+
+def baseline_rhymes(arpabet, word):
+    # find_rhymes as it was, without the slice: every word with a
+    # pronunciation ending in the rhyme part of word's first one
+    word_rhyme_part = get_rhyme_part(arpabet[word][0])
+    return {candidate for candidate, prons in arpabet.items()
+            if candidate != word and any(get_rhyme_part(p) == word_rhyme_part for p in prons)}
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('glove')
+    rng = np.random.default_rng(0)
+    glove_path = tmp / 'glove.txt'
+    with open(glove_path, 'w', encoding='utf-8') as f:
+        for word in WORDS:
+            f.write(word + ' ' + ' '.join(f'{x:.6f}' for x in rng.standard_normal(8)) + '\n')
+    build_store(str(glove_path), str(tmp / 'store'), workers=1)
+    return EmbeddingStore(str(tmp / 'store'))
+
+
+@pytest.fixture(scope='module')
+def compiled(tmp_path_factory):
+    store_dir = tmp_path_factory.mktemp('cmudict') / 'store'
+    compile_pronunciations(CMUDICT, str(store_dir))
+    return CompiledRhymeIndex(PronunciationStore(str(store_dir)))
+
+
+@pytest.mark.parametrize('top_n', [1, 3, 10, len(WORDS)])
+def test_top_k_matches_baseline(store, top_n):
+    engine = SimilarityEngine.from_embeddings(store)
+    for word in WORDS:
+        expected = baseline_similar(store, word, top_n)
+        result = engine.top_k(word, top_n)
+        assert [w for w, _ in result] == [w for w, _ in expected]
+        assert np.allclose([s for _, s in result], [s for _, s in expected], atol=1e-5)
+
+
+def test_top_k_batch_matches_top_k(store):
+    engine = SimilarityEngine.from_embeddings(store)
+    batch = engine.top_k_batch(WORDS + ['unknown'], 5)
+    assert batch[-1] == []
+    for word, result in zip(WORDS, batch):
+        expected = engine.top_k(word, 5)
+        assert [w for w, _ in result] == [w for w, _ in expected]
+        assert np.allclose([s for _, s in result], [s for _, s in expected], atol=1e-5)
+
+
+def test_rhyme_index_matches_baseline():
+    index = RhymeIndex(CMUDICT)
+    for word, prons in CMUDICT.items():
+        result = index.find(word, len(CMUDICT))
+        assert result == sorted(set(result))
+        if len(prons) == 1:
+            # The old loop only looked at the first pronunciation
+            assert result == sorted(baseline_rhymes(CMUDICT, word))
+        else:
+            assert baseline_rhymes(CMUDICT, word) <= set(result)
+
+
+def test_compiled_rhymes_match_rhyme_index(compiled):
+    index = RhymeIndex(CMUDICT)
+    for word in CMUDICT:
+        for top_n in (1, 2, 5, len(CMUDICT)):
+            assert compiled.find(word, top_n) == index.find(word, top_n)
+    assert compiled.find('missing') == index.find('missing') == []
+
+
+def test_no_rhymes_for_non_positive_top_n(compiled):
+    index = RhymeIndex(CMUDICT)
+    for top_n in (0, -1):
+        assert index.find('cat', top_n) == compiled.find('cat', top_n) == []
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from work_pool import WorkPool
+
+# Backpressure of the work pool: calls beyond max_pending are turned away
+# with a 503 at once, and capacity comes back as calls finish.
+# Run with: python -m pytest -q
+
+
+def test_full_pool_answers_503():
+    async def scenario():
+        pool = WorkPool(max_workers=1, max_pending=2)
+        release = threading.Event()
+        held = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.pending == 2 and pool.saturated()
+
+        with pytest.raises(HTTPException) as rejected:
+            await pool.run(lambda: 'never run')
+        assert rejected.value.status_code == 503
+        assert rejected.value.headers == {"Retry-After": "1"}
+        assert pool.rejected == 1
+        # Follow-up work of an admitted request is never turned away
+        follow_up = asyncio.ensure_future(pool.run(lambda: 'follow-up', check_capacity=False))
+
+        release.set()
+        assert await asyncio.gather(*held) == [True, True]
+        assert await follow_up == 'follow-up'
+        assert pool.pending == 0 and not pool.saturated()
+        assert await pool.run(lambda x: x * 2, 21) == 42
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_errors_free_their_slot():
+    async def scenario():
+        pool = WorkPool(max_workers=2, max_pending=1)
+
+        def fail():
+            raise ValueError('bad input')
+
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        assert pool.pending == 0
+        assert await pool.run(lambda: 'ok') == 'ok'
+        pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+# Rates a session may ask for, in words per second
+MIN_RATE = 0.1
+MAX_RATE = 20.0
+
+
+class StreamSession:
+    """
+    One open WebSocket: its language, pacing and seed words, and a small
+    queue of replies waiting to be sent. The queue is the flow control: a
+    client that reads slower than its rate fills it, and the hub skips the
+    session until there is room again instead of piling replies up.
+    """
+
+    def __init__(self, websocket, language='EN', rate=1.0, seeds=(), max_queued=4):
+        self.websocket = websocket
+        self.language = 'EN'
+        self.rate = 1.0
+        self.seeds = []
+        self.paused = False
+        self.configure({'language': language, 'rate': rate, 'seeds': list(seeds)})
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.next_due = time.monotonic()
+
+    def configure(self, config):
+        """
+        Apply a config message: any of language ('EN' / 'FA'), rate (words
+        per second), seeds (words to send first) and pause (bool)
+        """
+        if 'language' in config:
+            language = str(config['language']).upper()
+            if language not in ('EN', 'FA'):
+                raise ValueError(f"Unsupported language '{config['language']}'")
+            self.language = language
+        if 'rate' in config:
+            self.rate = min(MAX_RATE, max(MIN_RATE, float(config['rate'])))
+        if 'seeds' in config:
+            self.seeds = [str(word) for word in config['seeds']]
+        if 'pause' in config:
+            self.paused = bool(config['pause'])
+
+    def next_word(self):
+        """
+        The next seed word, or None for a random one
+        """
+        return self.seeds.pop(0) if self.seeds else None
+
+    async def send_loop(self):
+        while True:
+            reply = await self.queue.get()
+            await self.websocket.send_json(reply)
+
+
+class StreamHub:
+    """
+    Paces every open session and makes their replies together: on each tick
+    the sessions that are due are grouped by language and each group is
+    produced with one call on the work pool, so similarity scoring for all
+    of them shares one matrix product.
+
+    produce maps a language to a function taking a list of query words
+    (None for "pick a random word") and returning one reply per entry;
+    run is the work pool's run coroutine.
+    """
+
+    def __init__(self, produce, run, tick=0.01):
+        self.produce = produce
+        self.run = run
+        self.tick = tick
+        self.sessions = set()
+        self.task = None
+        self.batches = 0
+        self.queued = 0
+        self.skipped = 0
+
+    def add(self, session):
+        self.sessions.add(session)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.pace())
+
+    def remove(self, session):
+        self.sessions.discard(session)
+
+    def due(self, now):
+        groups = {}
+        for session in list(self.sessions):
+            if session.paused or session.next_due > now:
+                continue
+            # Never catch up on missed slots: a stalled client gets the
+            # normal rate once it reads again, not a burst
+            session.next_due = max(session.next_due + 1.0 / session.rate, now)
+            if session.queue.full():
+                self.skipped += 1
+                continue
+            groups.setdefault(session.language, []).append(session)
+        return groups
+
+    async def pace(self):
+        while self.sessions:
+            now = time.monotonic()
+            for language, sessions in self.due(now + self.tick).items():
+                query_words = [session.next_word() for session in sessions]
+                try:
+                    replies = await self.run(self.produce[language], query_words, check_capacity=False)
+                except Exception as e:
+                    print(f"Error: {e}")
+                    continue
+                self.batches += 1
+                for session, reply in zip(sessions, replies):
+                    if session in self.sessions and not session.queue.full():
+                        session.queue.put_nowait(reply)
+                        self.queued += 1
+            upcoming = [s.next_due for s in self.sessions if not s.paused]
+            wait = min(upcoming, default=now + self.tick * 10) - time.monotonic()
+            await asyncio.sleep(min(max(wait, self.tick), 0.1))
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "batches": self.batches,
+            "queued": self.queued,
+            "skipped": self.skipped,
+        }
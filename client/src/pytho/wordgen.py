@@ -1,18 +1,71 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal
 import uvicorn
 import asyncio
-import nltk
-from nltk.corpus import cmudict
-from nltk.corpus import words
 
-import numpy as np
 import random
+import json
+import os
+import threading
+import time
+
+from ann_index import ANN_DIR, IVFIndex, ann_exists, ann_matches
+from audio_cache import default_cache
+from block_corpus import BlockCorpus
+from build_resources import BUILD_LOCK, build_bundle, build_lock, bundle_exists, bundle_paths, ensure_pron_store
+from embedding_store import EmbeddingStore, quantize_store
+from metrics import Metrics
+from profiler import SamplingProfiler
+from reduced_tier import load_reduced, reduce_store, reduced_exists
+from pron_store import CompiledRhymeIndex, PronunciationStore
+from reply_buffer import ReplyBuffer
+from reply_table import ReplyTable, table_path
+from similarity import SimilarityEngine
+from word_stream import StreamHub, StreamSession
+from work_pool import WorkPool
+import rhyme_index_fa as fa_rhymes
 
 
 
 
 app = FastAPI()
+
+# Per-stage latency histograms and counters, served on /metrics
+metrics = Metrics()
+metrics.describe('wordgen_stage_seconds', 'histogram', 'Time spent per stage of building a reply')
+metrics.describe('wordgen_request_seconds', 'histogram', 'Request latency per route')
+metrics.describe('wordgen_requests_total', 'counter', 'Requests per route and status code')
+metrics.describe('wordgen_errors_total', 'counter', 'Replies that failed, per path')
+
+# Opt-in sampling profiler: with WORDGEN_PROFILE_DIR set, POST /profile
+# captures the next N requests to a collapsed-stack file in that directory
+profile_dir = os.environ.get('WORDGEN_PROFILE_DIR')
+profiler = SamplingProfiler()
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template, so /ready/en and /ready/fa count as one route
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.observe('wordgen_request_seconds', time.perf_counter() - start, route=route)
+    metrics.inc('wordgen_requests_total', route=route, status=response.status_code)
+    profiler.request_done()
+    return response
+
+# Blocking work runs on this pool, never on the event loop. WORDGEN_THREADS
+# sets the threads per worker process and WORDGEN_MAX_PENDING how many
+# requests may be queued or running before new ones get a 503.
+work_threads = int(os.environ.get('WORDGEN_THREADS', os.cpu_count() or 4))
+work_pool = WorkPool(work_threads, int(os.environ.get('WORDGEN_MAX_PENDING', 4 * work_threads)))
+
+@app.on_event("shutdown")
+def stop_work_pool():
+    work_pool.shutdown()
+
 # CORS setup
 # origins = ["http://localhost:3000"]
 app.add_middleware(
@@ -26,173 +79,572 @@ app.add_middleware(
 
 
 
-# Download the CMU Pronouncing Dictionary if not already downloaded
-nltk.download('cmudict')
-nltk.download('words')
-english_words = set(words.words())
-
-# Load the dictionary
-arpabet = cmudict.dict()
-# print('arpbet')
-# print(arpabet)
-# print('__________________')
-
-
+# Nothing heavy is loaded at import. The stores below are filled in by the
+# warm-up thread started with the app (see warm_up); each endpoint answers
+# 503 until the store it needs is ready, and /ready reports the state.
+#
+# Offline resource bundle (see build_resources.py): the embedding store and
+# the pronunciations. If it is missing, warm-up builds it once from
+# glove_path, which needs nltk and internet access. With several workers,
+# the first one to take the build lock builds whatever is missing (bundle,
+# compressed or reduced copies, Farsi offsets and index) and the others wait
+# for it, then only open the files.
+resources_dir = os.environ.get('WORDGEN_RESOURCES', './resources')
+glove_store_dir, cmudict_path = bundle_paths(resources_dir)
 
 # Path to your GloVe file (download from https://nlp.stanford.edu/projects/glove/)
 # Example: 'glove.6B.300d.txt'
 # glove_path = 'D:\\SUBLIME_PROJECTS\\glove.6B.300d.txt'
 glove_path = '.\\glove.6B.300d.txt'
 
-# Load embeddings into a dictionary
-embeddings = {}
-with open(glove_path, 'r', encoding='utf-8') as f:
-    for line in f:
-        values = line.strip().split()
-        word = values[0]
-        if word.lower() in english_words:
-            vector = np.array(values[1:], dtype='float32')
-            embeddings[word] = vector
-del english_words
-
-def read_blocks_from_file(filepath, encoding="utf-8"):
-    """
-    Reads a file and splits it into blocks.
-    Each block is a list of non-empty lines between blank lines.
-    Blank lines separate blocks (one or more blank lines allowed).
-    """
-    blocks = []
-    current_block = []
-
-    with open(filepath, "r", encoding=encoding) as f:
-        for raw_line in f:
-            line = raw_line.strip()  # remove surrounding whitespace, including \n
-            if line == "":
-                # End of a block (if we have accumulated words)
-                if current_block:
-                    blocks.append(current_block)
-                    current_block = []
-                # If there are consecutive blank lines, skip
-            else:
-                current_block.append(line)
-
-        # Catch any trailing block not followed by a blank line
-        if current_block:
-            blocks.append(current_block)
-
-    return blocks
-
-blocks = read_blocks_from_file("./big.txt")
-# print(blocks)
-
-def get_rhyme_part(pronunciation):
-    """
-    Extract the rhyme part (from the last stressed vowel to the end)
-    """
-    # Find the position of the last stressed vowel
-    for i in range(len(pronunciation)-1, -1, -1):
-        # The stress markers are '1' for primary stress, '2' for secondary
-        if pronunciation[i][-1] in ('1', '2'):
-            return pronunciation[i:]
-    # If no stressed vowel, return last part
-    return pronunciation[-1:]
-
-def find_rhymes(word, top_n=10):
+# Farsi corpus for /get-reply-fa. It is memory-mapped and indexed by block
+# offsets (see block_corpus.py). To swap in a new corpus without a restart,
+# rename the new file over this path (do not rewrite it in place). Every
+# worker holds its own copy, so each one looks at the file again (at most
+# every WORDGEN_FA_CHECK_SECONDS) when /get-reply-fa is called, and reloads
+# in the background if it changed; POST /reload-fa makes the worker that
+# receives it reload right away.
+fa_corpus_path = os.environ.get('WORDGEN_FA_CORPUS', "./big.txt")
+fa_check_seconds = float(os.environ.get('WORDGEN_FA_CHECK_SECONDS', 5))
+
+embeddings = None
+similarity = None
+rhyme_index = None
+rhyme_scorer = None
+reply_table = None
+blocks = None
+fa_index = None
+ready = {"fa": False, "en": False}
+
+
+# WORDGEN_EMBEDDING_MODE=f16 or int8 shortlists candidates from a compressed
+# copy of the matrix and re-scores the shortlist at full precision, so the
+# float32 rows barely need to be resident
+embedding_mode = os.environ.get('WORDGEN_EMBEDDING_MODE', 'f32')
+# WORDGEN_REDUCED_DIM=32 (say) searches a PCA-reduced copy of the matrix
+# instead (WORDGEN_REDUCED_METHOD=random for a random projection) and
+# re-ranks the best WORDGEN_REDUCED_RESCORE at full dimension (0: no
+# re-ranking). reduced_tier.py reports the accuracy of each setting.
+# The two are alternative search tiers: setting both is an error.
+reduced_dim = int(os.environ.get('WORDGEN_REDUCED_DIM', 0))
+reduced_method = os.environ.get('WORDGEN_REDUCED_METHOD', 'pca')
+
+def check_english_config():
+    if embedding_mode != 'f32' and reduced_dim:
+        raise ValueError(f"WORDGEN_EMBEDDING_MODE={embedding_mode} and WORDGEN_REDUCED_DIM={reduced_dim} "
+                         f"cannot be combined; set only one of them")
+
+def load_english():
+    """
+    Load the English stores from the resource bundle
+    """
+    global embeddings, similarity, rhyme_index, rhyme_scorer, reply_table
+    check_english_config()
+
+    with build_lock(os.path.join(resources_dir, BUILD_LOCK)):
+        if not bundle_exists(resources_dir):
+            print(f"Building resource bundle in {resources_dir} (one-time)...")
+            build_bundle(resources_dir, glove_path)
+        pron_store_dir = ensure_pron_store(resources_dir)
+        if embedding_mode != 'f32' and EmbeddingStore(glove_store_dir).quantized_unit(embedding_mode) is None:
+            quantize_store(glove_store_dir, embedding_mode)
+        if reduced_dim and not reduced_exists(glove_store_dir, reduced_dim, reduced_method):
+            reduce_store(glove_store_dir, reduced_dim, reduced_method)
+
+    # Compiled, memory-mapped pronunciations (pron_store.py): the rhyme part
+    # -> words lists and the phoneme-encoded tails for ranked near /
+    # multisyllabic rhymes are read from disk, nothing is built per worker
+    pronunciations = PronunciationStore(pron_store_dir)
+    rhymes = CompiledRhymeIndex(pronunciations)
+    scorer = pronunciations.rhyme_scorer()
+
+    # Read-only word -> vector view over the memory-mapped store
+    store = EmbeddingStore(glove_store_dir)
+    # Normalized-matrix top-k search over the same vocabulary
+    engine = SimilarityEngine.from_embeddings(store)
+    if embedding_mode != 'f32':
+        engine.use_compressed(*store.quantized_unit(embedding_mode))
+    if reduced_dim:
+        engine.use_reduced(*load_reduced(glove_store_dir, reduced_dim, reduced_method),
+                           rescore=int(os.environ.get('WORDGEN_REDUCED_RESCORE', 100)))
+    # Optional approximate index built by ann_index.py; searches probe only
+    # WORDGEN_ANN_NPROBE clusters (higher = better recall, slower)
+    if ann_matches(glove_store_dir):
+        engine.ann = IVFIndex.load(os.path.join(glove_store_dir, ANN_DIR))
+        engine.ann.nprobe = int(os.environ.get('WORDGEN_ANN_NPROBE', engine.ann.nprobe))
+    elif ann_exists(glove_store_dir):
+        print(f"Ignoring ANN index in {glove_store_dir}: built from another store; rebuild it with ann_index.py")
+
+    # Precomputed similar words and rhymes for the whole vocabulary (built
+    # offline by reply_table.py); without it every reply is computed live
+    table = None
+    if ReplyTable.matches(table_path(resources_dir), store, pronunciations):
+        table = ReplyTable(table_path(resources_dir), store.words, store.index, pronunciations.word_table)
+
+    rhyme_index, rhyme_scorer, embeddings, similarity, reply_table = rhymes, scorer, store, engine, table
+    ready["en"] = True
+
+
+def open_farsi():
+    """
+    The Farsi corpus, with its block offsets built if missing or stale
+    """
+    with build_lock(fa_corpus_path + '.lock'):
+        return BlockCorpus(fa_corpus_path)
+
+def open_farsi_index(corpus):
+    # Rhymes and neighbours for Farsi words (rhyme_index_fa.py); loaded from
+    # <corpus>.fa_index, or built and saved there the first time
+    with build_lock(fa_corpus_path + '.lock'):
+        return fa_rhymes.load_or_build(corpus)
+
+def load_farsi():
+    global blocks
+    blocks = open_farsi()
+    ready["fa"] = True
+
+def load_farsi_index():
+    # Farsi replies go without rhymes and neighbours until this is done
+    global fa_index
+    if blocks is not None:
+        fa_index = open_farsi_index(blocks)
+
+
+def warm_up():
+    """
+    Populate the stores in the background, Farsi first since it is cheap,
+    then English; the Farsi index (slow the first time) is built last so it
+    does not hold English back. The reply buffer starts once English is ready.
+    """
+    for name, load in (("fa", load_farsi), ("en", load_english), ("fa index", load_farsi_index)):
+        try:
+            load()
+        except Exception as e:
+            print(f"Error: warm-up of '{name}' failed: {e}")
+        if name == "en" and ready["en"]:
+            reply_buffer.start()
+
+@app.on_event("startup")
+def start_warm_up():
+    # A bad configuration stops the server here rather than leaving English
+    # warming up forever
+    check_english_config()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def require(component):
+    if not ready[component]:
+        raise HTTPException(status_code=503, detail=f"'{component}' store is warming up",
+                            headers={"Retry-After": "5"})
+
+@app.get("/ready")
+async def readiness():
+    """
+    200 once every store is loaded, 503 before; the body shows each store
+    """
+    status = dict(ready, ready=all(ready.values()))
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/ready/{component}")
+async def component_readiness(component: str):
+    """
+    Readiness of one store ('fa' or 'en'), e.g. to route Farsi traffic early
+    """
+    if component not in ready:
+        raise HTTPException(status_code=404, detail=f"Unknown component '{component}'")
+    return JSONResponse({component: ready[component]}, status_code=200 if ready[component] else 503)
+
+# 'exact' rhymes share the rhyme part exactly and come back as plain words;
+# 'scored' rhymes include near rhymes and come back as [word, score] pairs,
+# best first. WORDGEN_RHYME_MODE sets the default for /get-reply.
+default_rhyme_mode = os.environ.get('WORDGEN_RHYME_MODE', 'exact')
+
+def find_rhymes(word, top_n=10, mode=None):
     """
     Find words that rhyme with the given word
     """
-    word = word.lower()
-    if word not in arpabet:
-        print(f"Phonetic transcription for '{word}' not found.")
-        return []
-
-    rhymes = []
-    word_pronunciations = arpabet[word]
-    # For simplicity, consider only the first pronunciation
-    word_rhyme_part = get_rhyme_part(word_pronunciations[0])
-
-    for candidate, pronunciations in arpabet.items():
-        if candidate == word:
-            continue
-        # Check each pronunciation for rhyme
-        for pron in pronunciations:
-            if get_rhyme_part(pron) == word_rhyme_part:
-                rhymes.append(candidate)
-                break  # If any pronunciation matches, accept this word
-
-    # Remove duplicates, sort, and take top_n
-    unique_rhymes = list(set(rhymes))
-    return unique_rhymes[:top_n]
+    mode = mode or default_rhyme_mode
+    row = reply_table.row(word, top_n) if reply_table is not None else None
+    if row is not None:
+        return reply_table.rhymes(row, top_n, mode)
+    if mode == 'scored':
+        return rhyme_scorer.find(word, top_n)
+    return rhyme_index.find(word, top_n)
+
 
 # Function to find most similar words
 def find_similar_words(word, top_n=10):
-    if word not in embeddings:
-        print(f"Word '{word}' not found in embeddings.")
-        return []
+    row = reply_table.row(word, top_n) if reply_table is not None else None
+    if row is not None:
+        return reply_table.similar(row, top_n)
+    return similarity.top_k(word, top_n)
 
-    # Get the embedding for the input word
-    word_vec = embeddings[word]
 
-    # Compute cosine similarity with all other words
-    similarities = {}
-    for other_word, other_vec in embeddings.items():
-        if other_word == word or other_word in word or word in other_word:
-            continue
-        # Cosine similarity: dot product divided by norms
-        sim = np.dot(word_vec, other_vec) / (np.linalg.norm(word_vec) * np.linalg.norm(other_vec))
-        # Convert numpy float32 to Python float
-        similarities[other_word] = float(sim)
 
-    # Sort by similarity score, descending
-    most_similar = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
+def random_words(n):
+    """
+    n random vocabulary words, O(1) each (embeddings.words is a plain list)
+    """
+    vocabulary = embeddings.words
+    return [vocabulary[random.randrange(len(vocabulary))] for _ in range(n)]
 
-    # Return top N
-    return most_similar[:top_n]
 
+def make_replies(n):
+    """
+    n complete replies for random words, with their similarities scored in
+    one batch (or all looked up, with a reply table)
+    """
+    return replies_for([None] * n)
 
 
-@app.post("/get-reply")
-async def get_reply():
+def replies_for(query_words, path='en_buffer'):
+    """
+    One complete reply per query word (None entries become random words),
+    with the similarities scored in one batch
+    """
+    with metrics.time('wordgen_stage_seconds', path=path, stage='sample'):
+        drawn = iter(random_words(query_words.count(None)))
+        query_words = [next(drawn) if word is None else word for word in query_words]
+    if reply_table is not None:
+        with metrics.time('wordgen_stage_seconds', path=path, stage='table'):
+            return [{"word": word, "sims": find_similar_words(word),
+                     "rhymes": find_rhymes(word) if word.lower() in rhyme_index else []}
+                    for word in query_words]
+    with metrics.time('wordgen_stage_seconds', path=path, stage='similarity'):
+        batch_sims = similarity.top_k_batch(query_words)
+    with metrics.time('wordgen_stage_seconds', path=path, stage='rhymes'):
+        return [
+            {"word": word, "sims": sims, "rhymes": find_rhymes(word) if word.lower() in rhyme_index else []}
+            for word, sims in zip(query_words, batch_sims)
+        ]
+
+
+def make_reply():
     try:
-        rand_words ={}
-        for H in range (100):
-            random_key = random.choice(list(embeddings.keys()))
-            if random_key not in rand_words:
-                rand_words[random_key]=H
-
-        word_to_analyze = list(rand_words.keys())[-1]
-        similars=find_similar_words(word_to_analyze)
-        rhymes = find_rhymes(word_to_analyze)
+        with metrics.time('wordgen_stage_seconds', path='en', stage='sample'):
+            word_to_analyze = random_words(1)[0]
+        with metrics.time('wordgen_stage_seconds', path='en', stage='similarity'):
+            similars=find_similar_words(word_to_analyze)
+        with metrics.time('wordgen_stage_seconds', path='en', stage='rhymes'):
+            rhymes = find_rhymes(word_to_analyze)
 
         return {
-            "word": random_key,
+            "word": word_to_analyze,
             "sims": similars,
             "rhymes": rhymes,
         }
 
     except Exception as e:
+        metrics.inc('wordgen_errors_total', path='en')
         print(f"Error: {e}")
         return {"word": "", "sims": [], "rhymes": []}
 
-@app.post("/get-reply-fa")
-async def get_reply_fa():
-    try:
-        random_gp = random.choice( blocks )
+# Replies prepared ahead of time by a background thread. WORDGEN_BUFFER_DEPTH
+# is how many are kept ready (0 disables the buffer), WORDGEN_BUFFER_BATCH
+# how many are made per refill and WORDGEN_BUFFER_INTERVAL the pause in
+# seconds between refills.
+reply_buffer = ReplyBuffer(
+    make_replies,
+    depth=int(os.environ.get('WORDGEN_BUFFER_DEPTH', 64)),
+    refill_batch=int(os.environ.get('WORDGEN_BUFFER_BATCH', 16)),
+    refill_interval=float(os.environ.get('WORDGEN_BUFFER_INTERVAL', 0.01)),
+)
 
+@app.on_event("shutdown")
+def stop_reply_buffer():
+    reply_buffer.stop()
 
-        word_to_analyze = random_gp[-1]
-        # similars=find_similar_words(word_to_analyze)
-        # rhymes = find_rhymes(word_to_analyze)
-        # word_2_send= random.choice(word_to_analyze)
+def encode_reply(reply, path):
+    """
+    The JSON response for a reply, timing the encoding as its own stage
+    """
+    with metrics.time('wordgen_stage_seconds', path=path, stage='encode'):
+        return JSONResponse(reply)
+
+@app.post("/get-reply")
+async def get_reply():
+    require("en")
+    reply = reply_buffer.pop()
+    if reply is not None:
+        return encode_reply(reply, 'en')
+    # Buffer ran dry: compute this one live
+    return encode_reply(await work_pool.run(make_reply), 'en')
+
+# Buffer, pool and store state, read when /metrics is scraped
+metrics.describe('wordgen_reply_buffer_hits', 'counter', 'Replies served from the reply buffer')
+metrics.describe('wordgen_reply_buffer_misses', 'counter', 'Requests that found the reply buffer empty')
+metrics.describe('wordgen_reply_buffer_produced', 'counter', 'Replies made by the buffer producer')
+metrics.describe('wordgen_reply_buffer_errors', 'counter', 'Failed buffer refills')
+metrics.describe('wordgen_work_pool_rejected', 'counter', 'Requests turned away with a 503')
+metrics.gauge('wordgen_reply_buffer_buffered', lambda: len(reply_buffer.replies))
+for _name in ('hits', 'misses', 'produced', 'errors'):
+    metrics.gauge('wordgen_reply_buffer_' + _name, lambda name=_name: getattr(reply_buffer, name))
+metrics.gauge('wordgen_work_pool_pending', lambda: work_pool.pending)
+metrics.gauge('wordgen_work_pool_rejected', lambda: work_pool.rejected)
+metrics.gauge('wordgen_reply_table_loaded', lambda: reply_table is not None)
+for _component in ready:
+    metrics.gauge('wordgen_ready', lambda component=_component: ready[component], component=_component)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/profile")
+async def profile(requests: int = 100, interval_ms: float = 5.0):
+    """
+    Sample the stacks of all threads while the next `requests` requests run
+    and write them to WORDGEN_PROFILE_DIR as collapsed stacks (for
+    flamegraph.pl or speedscope). Disabled unless WORDGEN_PROFILE_DIR is set.
+    """
+    if not profile_dir:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set WORDGEN_PROFILE_DIR)")
+    path = os.path.join(profile_dir, f"wordgen-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.txt")
+    # The request starting the capture counts too, so it ends after N more
+    if not profiler.start(requests + 1, path, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    return {"path": path, "requests": requests}
+
+@app.get("/stats")
+async def stats():
+    return {
+        "reply_buffer": reply_buffer.stats(),
+        "stream": stream_hub.stats(),
+        "audio_cache": audio_cache.stats() if audio_cache is not None else None,
+        "work_pool": {"pending": work_pool.pending, "max_pending": work_pool.max_pending,
+                      "rejected": work_pool.rejected},
+    }
+
+class BatchRequest(BaseModel):
+    # Either explicit query words, or how many random words to draw
+    words: list[str] = []
+    count: int = 0
+    top_n: int = Field(10, ge=1, le=100)
+    rhyme_mode: Literal["exact", "scored"] = "exact"
+
+
+# Upper bound on words per batch request
+MAX_BATCH_WORDS = 1000
+
+
+def batch_lines(block, top_n, rhyme_mode="exact"):
+    """
+    NDJSON lines (one per word) for a block of query words. Similarities for
+    the whole block come from one matrix-matrix product.
+    """
+    lines = []
+    for word, sims in zip(block, similarity.top_k_batch(block, top_n, len(block))):
+        reply = {
+            "word": word,
+            "sims": [[other, round(score, 4)] for other, score in sims],
+            "rhymes": find_rhymes(word, top_n, rhyme_mode) if word.lower() in rhyme_index else [],
+        }
+        lines.append(json.dumps(reply, ensure_ascii=False, separators=(',', ':')) + "\n")
+    return "".join(lines)
+
+
+async def batch_replies(query_words, top_n, rhyme_mode="exact", block_size=256):
+    """
+    Stream batch_lines block by block from the work pool, so the first lines
+    are sent before later blocks are scored
+    """
+    for start in range(0, len(query_words), block_size):
+        yield await work_pool.run(batch_lines, query_words[start:start + block_size], top_n,
+                                  rhyme_mode, check_capacity=False)
+
+
+@app.post("/get-replies")
+async def get_replies(request: BatchRequest):
+    """
+    Batch version of /get-reply, streamed as NDJSON (one reply per line)
+    """
+    require("en")
+    # Admission is decided once, before the stream starts
+    work_pool.check_capacity()
+    query_words = request.words[:MAX_BATCH_WORDS]
+    if not query_words and request.count > 0:
+        query_words = random.sample(embeddings.words, min(request.count, MAX_BATCH_WORDS, len(embeddings)))
+    return StreamingResponse(batch_replies(query_words, request.top_n, request.rhyme_mode),
+                             media_type="application/x-ndjson")
+
+class CompositeQuery(BaseModel):
+    # A theme: suggestions close to the centroid of the seeds
+    seeds: list[str] = []
+    # Or an analogy [a, b, c]: suggestions close to a - b + c
+    analogy: list[str] = []
+
+
+class SimilarRequest(BaseModel):
+    queries: list[CompositeQuery]
+    top_n: int = Field(10, ge=1, le=100)
+
+
+def composite_terms(query):
+    """
+    (positive, negative) words of a CompositeQuery
+    """
+    if query.analogy:
+        if len(query.analogy) != 3:
+            raise HTTPException(status_code=422, detail="An analogy takes exactly three words [a, b, c]")
+        a, b, c = query.analogy
+        return [a, c], [b]
+    return query.seeds, []
+
+
+@app.post("/get-similar")
+async def get_similar(request: SimilarRequest):
+    """
+    Similar words for several composite queries at once (seed centroids and
+    a - b + c analogies), scored together in one matrix product. Words
+    related to any input word of a query are left out of its results.
+    """
+    require("en")
+    terms = [composite_terms(query) for query in request.queries[:MAX_BATCH_WORDS]]
+    results = await work_pool.run(similarity.top_k_composite, terms, request.top_n)
+    return {"results": [[[word, round(score, 4)] for word, score in result] for result in results]}
+
+def make_reply_fa(word_to_analyze=None):
+    try:
+        if word_to_analyze is None:
+            with metrics.time('wordgen_stage_seconds', path='fa', stage='sample'):
+                random_gp = blocks.random_block()
+
+
+            word_to_analyze = random_gp[-1]
+        # The Farsi index may still be building; the bare word is sent until then
+        index = fa_index
+        with metrics.time('wordgen_stage_seconds', path='fa', stage='similarity'):
+            similars = index.neighbours(word_to_analyze) if index is not None else []
+        with metrics.time('wordgen_stage_seconds', path='fa', stage='rhymes'):
+            rhymes = index.rhymes(word_to_analyze) if index is not None else []
         return {
             "word": word_to_analyze,
-            # "sims": similars,
-            # "rhymes": rhymes,
+            "sims": similars,
+            "rhymes": rhymes,
         }
 
     except Exception as e:
+        metrics.inc('wordgen_errors_total', path='fa')
         print(f"Error: {e}")
-        return {"word": ""}#, "sims": [], "rhymes": []}
+        return {"word": "", "sims": [], "rhymes": []}
+
+fa_reload_lock = asyncio.Lock()
+fa_reload = None  # background reload started by check_farsi
+fa_checked_at = time.monotonic()
+
+async def reload_farsi():
+    """
+    Re-open the Farsi corpus (re-indexing it if the file changed) and swap it
+    in, unless the file is the one already loaded; True if it was reloaded.
+    Requests already running keep the old one.
+    """
+    global blocks, fa_index
+    async with fa_reload_lock:
+        if blocks is not None and fa_index is not None and not blocks.is_stale():
+            return False
+        corpus = await work_pool.run(open_farsi)
+        index = await work_pool.run(open_farsi_index, corpus)
+        blocks, fa_index = corpus, index
+        ready["fa"] = True
+        return True
+
+async def reload_farsi_in_background():
+    try:
+        await reload_farsi()
+    except Exception as e:
+        print(f"Error: reload of {fa_corpus_path} failed: {e}")
+
+def check_farsi():
+    """
+    Start a background reload if the corpus file changed since this worker
+    opened it, looking at most every fa_check_seconds; the old corpus keeps
+    answering until the new one is in
+    """
+    global fa_checked_at, fa_reload
+    now = time.monotonic()
+    if now - fa_checked_at < fa_check_seconds or fa_index is None or (fa_reload and not fa_reload.done()):
+        return
+    fa_checked_at = now
+    try:
+        stale = blocks.is_stale()
+    except OSError:
+        return  # being replaced; look again next time
+    if stale:
+        fa_reload = asyncio.create_task(reload_farsi_in_background())
+
+@app.post("/get-reply-fa")
+async def get_reply_fa():
+    require("fa")
+    check_farsi()
+    return encode_reply(await work_pool.run(make_reply_fa), 'fa')
+
+
+# Continuous suggestions over one WebSocket per session (see word_stream.py);
+# the sessions due on a tick are produced together, per language
+stream_hub = StreamHub({
+    "EN": lambda query_words: replies_for(query_words, path='en_stream'),
+    "FA": lambda query_words: [make_reply_fa(word) for word in query_words],
+}, work_pool.run)
+
+async def close_not_ready(websocket, session):
+    await websocket.close(code=1013, reason=f"'{session.language.lower()}' store is warming up")
+
+@app.websocket("/stream")
+async def stream(websocket: WebSocket):
+    """
+    The first message configures the session:
+        {"language": "EN" | "FA", "rate": words per second, "seeds": [words to send first]}
+    after which the server pushes {word, sims, rhymes} messages at that rate.
+    Later messages change the session the same way, plus {"pause": true/false}.
+    """
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        session = StreamSession(websocket)
+        session.configure(config)
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+    except WebSocketDisconnect:
+        return
+    if not ready[session.language.lower()]:
+        await close_not_ready(websocket, session)
+        return
+
+    sender = asyncio.create_task(session.send_loop())
+    stream_hub.add(session)
+    try:
+        while True:
+            try:
+                session.configure(await websocket.receive_json())
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                # KeyError: a binary frame where JSON text was expected
+                await websocket.send_json({"error": str(e)})
+                continue
+            # A switch to a language still warming up is refused like a
+            # connection for it would be
+            if not ready[session.language.lower()]:
+                stream_hub.remove(session)  # before the await, so no empty reply goes out
+                await close_not_ready(websocket, session)
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_hub.remove(session)
+        sender.cancel()
+        # Collect the send loop's outcome, so an error in it is reported
+        # rather than left unretrieved on the task
+        for result in await asyncio.gather(sender, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, WebSocketDisconnect):
+                print(f"Error: stream send loop failed: {result!r}")
+
+@app.post("/reload-fa")
+async def reload_fa():
+    """
+    Reload the Farsi corpus and index now if the file changed (see
+    reload_farsi). Only the worker that receives this reloads; the others
+    pick the change up on their next Farsi request (check_farsi).
+    """
+    reloaded = await reload_farsi()
+    return {"path": fa_corpus_path, "blocks": len(blocks), "words": len(fa_index.words), "reloaded": reloaded}
 
 
 
@@ -205,11 +657,66 @@ async def get_reply_fa():
 #_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====
 #_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====_____=====
 
+# Tracks are named relative to WORDGEN_AUDIO_DIR (the client's public
+# folder by default); decoded audio and results are kept in the audio cache
+# (AUDIO_CACHE_DIR / AUDIO_CACHE_MB, see audio_cache.py)
+audio_dir = os.path.realpath(os.environ.get('WORDGEN_AUDIO_DIR', '../../public'))
+audio_cache = default_cache()
+if audio_cache is not None:
+    for _name in ('pcm_hits', 'pcm_misses', 'feature_hits', 'feature_misses', 'evictions'):
+        metrics.gauge('wordgen_audio_cache_' + _name, lambda name=_name: audio_cache.counts[name])
+
+class AudioRequest(BaseModel):
+    path: str
+    notes: bool = False
+    pitch: str = "pyin"  # or "fast" (pitch_fast.py)
+
+def analyze_track(audio_path, notes, pitch="pyin"):
+    # librosa is only needed (and imported) once audio is asked for
+    from audio_analysis import analyze
+
+    track = analyze(audio_path)
+    reply = track.summary()
+    # analyze() keeps the last few tracks; only their results need to stay
+    track.drop_spectrograms()
+    if notes:
+        frame = track.notes(pitch)
+        voiced = frame[frame['voiced']]
+        reply["notes"] = [[round(float(t), 3), note] for t, note in zip(voiced['time'], voiced['note'])]
+    return reply
+
+@app.post("/analyze-audio")
+async def analyze_audio(request: AudioRequest):
+    """
+    Duration, BPM, beat and onset times (and with notes, the voiced
+    (time, note) frames) of a track under WORDGEN_AUDIO_DIR
+    """
+    if request.pitch not in ("pyin", "fast"):
+        raise HTTPException(status_code=422, detail=f"Unknown pitch method '{request.pitch}'")
+    audio_path = os.path.realpath(os.path.join(audio_dir, request.path))
+    if not audio_path.startswith(audio_dir + os.sep) or not os.path.isfile(audio_path):
+        raise HTTPException(status_code=404, detail=f"No track '{request.path}'")
+    try:
+        reply = await work_pool.run(analyze_track, audio_path, request.notes, request.pitch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        metrics.inc('wordgen_errors_total', path='audio')
+        raise HTTPException(status_code=422, detail=f"Could not analyse '{request.path}': {e}")
+    return {"path": request.path, **reply}
 
 
 
 
 
-if __name__ == "__main__":
 
-    uvicorn.run("wordgen:app", host="0.0.0.0", port=5000)
+if __name__ == "__main__":
+    # Single process:       python wordgen.py
+    # Several processes:    WORDGEN_WORKERS=4 python wordgen.py
+    #   or equivalently     uvicorn wordgen:app --host 0.0.0.0 --port 5000 --workers 4
+    # Every worker memory-maps the same embedding store, so the matrix pages
+    # are shared through the OS cache. With several workers, also set
+    # OPENBLAS_NUM_THREADS / OMP_NUM_THREADS to 1-2 so the BLAS thread pools
+    # of the workers do not oversubscribe the cores.
+    workers = int(os.environ.get('WORDGEN_WORKERS', 1))
+    uvicorn.run("wordgen:app", host="0.0.0.0", port=5000, workers=workers)
@@ -0,0 +1,51 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class WorkPool:
+    """
+    Runs blocking work (NumPy scoring, rhyme lookups) on a fixed set of
+    threads so the asyncio event loop stays free to accept requests.
+    At most max_pending calls may be queued or running; beyond that callers
+    get a 503 straight away instead of piling up latency.
+    NumPy releases the GIL inside matrix products, so threads overlap there;
+    to use more cores for the Python parts run several uvicorn workers.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wordgen')
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        # Only touched from the event loop thread, so no lock is needed
+        self.pending = 0
+        self.rejected = 0
+
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    def check_capacity(self):
+        """
+        Raise a 503 if the queue is full
+        """
+        if self.saturated():
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly",
+                                headers={"Retry-After": "1"})
+
+    async def run(self, fn, *args, check_capacity=True):
+        """
+        Run fn(*args) on the pool. check_capacity=False is for follow-up work
+        of a request that was already admitted (e.g. later blocks of a stream).
+        """
+        if check_capacity:
+            self.check_capacity()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
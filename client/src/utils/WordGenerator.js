@@ -64,4 +64,128 @@ export async function fetchRandomWord(lang) {
     // suggest these were state updates within a React component, not part of a utility.
     // So, they are not included here.
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Fetches a batch of English words with their similar words and rhymes in a single request.
+ * The backend streams NDJSON (one `{ word, sims, rhymes }` object per line), so replies are
+ * handed to `onReply` as soon as each line arrives.
+ *
+ * @param {object} options
+ * @param {string[]} [options.words] - Words to analyze. If empty, `count` random words are drawn.
+ * @param {number} [options.count=20] - How many random words to draw when `words` is empty.
+ * @param {number} [options.topN=10] - Similar words / rhymes per word.
+ * @param {function} [options.onReply] - Called with each reply as it is parsed.
+ * @returns {Promise<object[]>} All replies, in request order. Empty array if the call fails.
+ */
+export async function fetchWordBatch({ words = [], count = 20, topN = 10, onReply = null } = {}) {
+  const replies = [];
+  try {
+    const response = await fetch('http://localhost:5000/get-replies', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ words, count, top_n: topN })
+    });
+
+    if (!response.ok) {
+      const errorData = await response.text();
+      throw new Error(`HTTP error! status: ${response.status}, message: ${errorData}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const reply = JSON.parse(line);
+      replies.push(reply);
+      if (onReply) onReply(reply);
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop(); // Keep the incomplete trailing line for the next chunk
+      lines.forEach(handleLine);
+    }
+    handleLine(buffered + decoder.decode());
+
+  } catch (err) {
+    console.error('Error fetching word batch from backend:', err);
+  }
+  return replies;
+}
+
+/**
+ * Opens a WebSocket session that streams `{ word, sims, rhymes }` replies at a steady rate,
+ * instead of one HTTP POST per word. The server paces the session and stops sending while
+ * the client falls behind.
+ *
+ * @param {object} options
+ * @param {string} [options.lang='EN'] - 'EN' or 'FA'.
+ * @param {number} [options.rate=1] - Words per second (0.1 to 20).
+ * @param {string[]} [options.seeds] - Words to stream first, before random ones.
+ * @param {function} options.onReply - Called with each reply.
+ * @param {function} [options.onClose] - Called with the close event (e.g. code 1013 while the server warms up).
+ * @returns {{ update: function(object): void, close: function(): void }}
+ *          `update` changes the session (`{ rate }`, `{ seeds }`, `{ language }`, `{ pause: true }`).
+ */
+export function openWordStream({ lang = 'EN', rate = 1, seeds = [], onReply, onClose = null } = {}) {
+  const socket = new WebSocket('ws://localhost:5000/stream');
+  const send = (config) => {
+    if (socket.readyState === WebSocket.OPEN) socket.send(JSON.stringify(config));
+  };
+
+  socket.onopen = () => send({ language: lang, rate, seeds });
+  socket.onmessage = (event) => {
+    const reply = JSON.parse(event.data);
+    if (reply.error) {
+      console.warn('Word stream rejected a setting:', reply.error);
+      return;
+    }
+    onReply(reply);
+  };
+  socket.onerror = (err) => console.error('Word stream error:', err);
+  socket.onclose = (event) => {
+    if (onClose) onClose(event);
+  };
+
+  return {
+    update: send,
+    close: () => socket.close(),
+  };
+}
+
+/**
+ * Fetches suggestions for composite English queries in one request: a theme made of
+ * several seed words (`{ seeds: ['fire', 'night'] }`) or an analogy a - b + c
+ * (`{ analogy: ['king', 'man', 'woman'] }`). Words related to any input word are left out.
+ *
+ * @param {object[]} queries - Query objects as above.
+ * @param {number} [topN=10] - Suggestions per query.
+ * @returns {Promise<Array<Array<[string, number]>>>} One `[word, similarity]` list per query.
+ *          Empty array if the call fails.
+ */
+export async function fetchSimilar(queries, topN = 10) {
+  try {
+    const response = await fetch('http://localhost:5000/get-similar', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ queries, top_n: topN })
+    });
+
+    if (!response.ok) {
+      const errorData = await response.text();
+      throw new Error(`HTTP error! status: ${response.status}, message: ${errorData}`);
+    }
+
+    const data = await response.json();
+    return data.results;
+
+  } catch (err) {
+    console.error('Error fetching similar words from backend:', err);
+    return [];
+  }
+}